@@ -0,0 +1,230 @@
+"""
+Measures the host side performance of curvequery against the simulated instrument of
+curvequery.simulator, so that releases can be compared without an instrument.
+
+Each benchmark reports the number of samples processed per second, counting every
+source returned by curve() and taking the best of several repeats, and the peak
+memory allocated while it runs, as traced by the tracemalloc module.
+
+Usage:
+    python benchmarks/bench_curvequery.py [--lengths N [N ...]] [--repeat N]
+        [--filter TEXT] [--json FILE]
+"""
+
+import argparse
+import json
+import sys
+import tracemalloc
+from time import perf_counter
+
+import numpy as np
+from tqdm import tqdm
+from visadore import get
+
+from curvequery import __VERSION__
+from curvequery.api_types import XScale
+from curvequery.api_types import YScale
+from curvequery.simulator import SimulatedResourceManager
+from curvequery._tek_series_mso import ProcessOptions
+from curvequery._tek_series_mso_curve_feat import TekSeriesCurveFeat
+
+DEFAULT_LENGTHS = [1000, 100000, 10000000]
+RESOURCE_NAME = "SIM::INSTR"
+X_SCALE = XScale(1.6e-10, 0.0, "s")
+Y_SCALE = YScale(5.0, -5.0)
+
+# The sources downloaded by each curve() benchmark
+SOURCE_MIXES = {
+    "analog": ["CH1"],
+    "dch": ["CH3"],
+    "math": ["MATH1"],
+    "mixed": ["CH1", "CH2", "CH3", "MATH1"],
+}
+
+
+def _curve_response(length):
+    """Returns a session with a simulated instrument, the instrument and its response
+    to a curve query. The response is built once, so that the read benchmarks only
+    measure the reader."""
+    rm = SimulatedResourceManager(record_length=length)
+    inst = rm.open_resource(RESOURCE_NAME)
+    inst.chunk_size = 1024 * 1024
+    sim = rm.instrument(RESOURCE_NAME)
+    sim.write("curv?")
+    return inst, sim, sim.output
+
+
+def bench_read_ieee_block(length):
+    """Returns a function that reads a curve query block of 16-bit codes with the
+    progress bar reader used by the curve feature"""
+    inst, sim, response = _curve_response(length)
+    pbar = tqdm(disable=True)
+    TekSeriesCurveFeat._patch_progress_bar(inst, pbar)
+
+    def run():
+        sim.output = response
+        inst.read_ieee_block_progress_bar(datatype="h", is_big_endian=True)
+        return length
+
+    return run
+
+
+def bench_read_binary_values(length):
+    """Returns a function that reads a curve query block of 16-bit codes with the
+    patched version of the pyvisa read_binary_values() method"""
+    inst, sim, response = _curve_response(length)
+    TekSeriesCurveFeat._patch_progress_bar(inst, tqdm(disable=True))
+
+    def run():
+        sim.output = response
+        inst.read_binary_values_progress_bar(
+            datatype="h", is_big_endian=True, container=np.array
+        )
+        return length
+
+    return run
+
+
+def _codes(length, channel):
+    """Returns the big-endian 16-bit codes of a simulated channel"""
+    sim = SimulatedResourceManager(record_length=length).instrument(RESOURCE_NAME)
+    return sim.waveform(channel).astype(">i2")
+
+
+def bench_post_process_analog(length):
+    """Returns a function that scales the codes of an analog channel"""
+    codes = _codes(length, "CH1")
+    options = ProcessOptions(True, np.float64, False, False)
+
+    def run():
+        TekSeriesCurveFeat._post_process_analog(
+            "CH1", codes, X_SCALE, Y_SCALE, (1.5e-4, 0.0), options
+        )
+        return length
+
+    return run
+
+
+def bench_post_process_digital_bits(length):
+    """Returns a function that decomposes the codes of a DCH channel into bits"""
+    codes = _codes(length, "CH3")
+    sources = ["CH3_D{}".format(i) for i in range(8)]
+
+    def run():
+        list(
+            TekSeriesCurveFeat._post_process_digital_bits(
+                sources, "CH3", codes, X_SCALE, False
+            )
+        )
+        return length
+
+    return run
+
+
+def bench_post_process_digital_byte(length):
+    """Returns a function that converts the codes of a DCH channel into bytes"""
+    codes = _codes(length, "CH3")
+
+    def run():
+        TekSeriesCurveFeat._post_process_digital_byte("CH3", codes, X_SCALE)
+        return length
+
+    return run
+
+
+def bench_curve(sources):
+    """Returns a function that creates a benchmark of a full curve() call that
+    downloads the given sources"""
+
+    def bench(length):
+        rm = SimulatedResourceManager(record_length=length)
+        sim = rm.instrument(RESOURCE_NAME)
+        sim.write("ACQuire:STATE STOP")
+        # The simulated waveforms are generated before the first call is measured
+        for channel in sim.analog + sim.digital + sim.math:
+            sim.waveform(channel)
+        osc = get(RESOURCE_NAME, resource_manager=rm)
+
+        def run():
+            result = osc.curve(use_pbar=False, as_ndarray=True, sources=sources)
+            return length * len(result)
+
+        return run
+
+    return bench
+
+
+BENCHMARKS = {
+    "read_ieee_block_progress_bar": bench_read_ieee_block,
+    "read_binary_values_progress_bar": bench_read_binary_values,
+    "post_process_analog": bench_post_process_analog,
+    "post_process_digital_bits": bench_post_process_digital_bits,
+    "post_process_digital_byte": bench_post_process_digital_byte,
+}
+BENCHMARKS.update(
+    {"curve_{}".format(name): bench_curve(i) for name, i in SOURCE_MIXES.items()}
+)
+
+
+def measure(run, repeat):
+    """Returns the samples per second of the fastest of several calls to run() and
+    the peak memory (in bytes) allocated by the first call"""
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    best = None
+    for _ in range(repeat):
+        start = perf_counter()
+        samples = run()
+        seconds = perf_counter() - start
+        if best is None or seconds < best[1]:
+            best = samples, seconds
+    return best[0] / best[1], peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--lengths",
+        type=int,
+        nargs="+",
+        default=DEFAULT_LENGTHS,
+        help="record lengths to benchmark (default: {})".format(DEFAULT_LENGTHS),
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="timed calls of each benchmark"
+    )
+    parser.add_argument(
+        "--filter", default="", help="only run benchmarks whose name contains TEXT"
+    )
+    parser.add_argument("--json", help="also write the results to a JSON file")
+    args = parser.parse_args(argv)
+
+    results = []
+    print("curvequery {}".format(__VERSION__))
+    print(
+        "{:<34}{:>12}{:>16}{:>12}".format("benchmark", "length", "samples/s", "peak MB")
+    )
+    for name, bench in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        for length in args.lengths:
+            rate, peak = measure(bench(length), args.repeat)
+            results.append(
+                {"name": name, "length": length, "samples_per_s": rate, "peak": peak}
+            )
+            print(
+                "{:<34}{:>12}{:>16.4g}{:>12.1f}".format(name, length, rate, peak / 1e6)
+            )
+            sys.stdout.flush()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"version": __VERSION__, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,3 @@
 __VERSION__ = "3.1.1"
+
+from .parallel import curve_many  # noqa: E402,F401
@@ -0,0 +1,152 @@
+import numpy as np
+
+# Number of samples processed per block. Blocks of this size fit comfortably in the
+# CPU cache, so the passes over a block only touch main memory once.
+BLOCK_SIZE = 1 << 16
+
+
+def scale_analog(codes, y_mult, y_zero, y_off=0.0, dtype=np.float64):
+    """
+    Returns a floating point array containing the vertical values of the waveform
+    codes, calculated as ((codes - y_off) * y_mult) + y_zero.
+
+    Parameters:
+        codes (numpy.ndarray): Waveform codes downloaded from the instrument.
+        y_mult (float): The vertical scale factor (WFMOutpre:YMUlt).
+        y_zero (float): The vertical offset in vertical units (WFMOutpre:YZEro).
+        y_off (float): The vertical offset in digitizing levels (WFMOutpre:YOFf).
+            (default: 0.0)
+        dtype (numpy.dtype): The floating point data type of the result. If the codes
+            already have this data type, they are scaled in place.
+            (default: numpy.float64)
+    """
+    dtype = np.dtype(dtype)
+    codes = np.asarray(codes)
+    if codes.dtype == dtype and codes.flags.writeable:
+        result = codes
+    else:
+        result = np.empty(codes.shape, dtype=dtype)
+
+    # Fold the digitizing level offset into the vertical offset so each sample only
+    # needs a single multiply and add
+    y_zero = y_zero - y_off * y_mult
+
+    flat_codes = codes.reshape(-1)
+    flat_result = result.reshape(-1)
+    for start in range(0, flat_codes.size, BLOCK_SIZE):
+        stop = start + BLOCK_SIZE
+        block = flat_result[start:stop]
+        np.multiply(flat_codes[start:stop], y_mult, out=block, dtype=dtype)
+        np.add(block, y_zero, out=block, dtype=dtype)
+    return result
+
+
+def fits_in_8_bits(codes):
+    """
+    Returns True if the low byte of every 16-bit waveform code is zero, in which case
+    an 8-bit transfer of the waveform, which sends the high byte of each code, loses
+    no resolution.
+
+    Parameters:
+        codes (numpy.ndarray): The 16-bit waveform codes downloaded from the
+            instrument.
+    """
+    codes = _unsigned_codes(codes)
+    for start in range(0, codes.size, BLOCK_SIZE):
+        if np.any(codes[start : start + BLOCK_SIZE] & 0xFF):
+            return False
+    return True
+
+
+def _make_digital_lut():
+    """Returns a lookup table that maps each 16-bit DCH code onto its 8-bit word"""
+    codes = np.arange(1 << 16, dtype=np.uint32)
+    lut = np.zeros(1 << 16, dtype=np.uint8)
+    for bit in range(8):
+        lut |= (((codes >> (2 * bit)) & 1) << bit).astype(np.uint8)
+    return lut
+
+
+# Each digital line occupies every other bit of a 16-bit DCH code, so bit n of the
+# 8-bit word is bit 2n of the code
+DIGITAL_LUT = _make_digital_lut()
+
+
+def _unsigned_codes(codes):
+    """Returns a flat unsigned view of 16-bit codes in either byte order"""
+    codes = np.asarray(codes).reshape(-1)
+    return codes.view(codes.dtype.str[0] + "u2")
+
+
+def digital_byte(codes):
+    """
+    Returns a uint8 array containing the 8-bit words of a DCH waveform, gathering all
+    eight digital lines of each sample with a single table lookup.
+
+    Parameters:
+        codes (numpy.ndarray): The 16-bit DCH codes downloaded from the instrument.
+    """
+    codes = _unsigned_codes(codes)
+    result = np.empty(codes.size, dtype=np.uint8)
+    for start in range(0, codes.size, BLOCK_SIZE):
+        stop = start + BLOCK_SIZE
+        np.take(DIGITAL_LUT, codes[start:stop], out=result[start:stop])
+    return result
+
+
+def digital_bits(codes, bits=range(8), packed=False):
+    """
+    Returns a dictionary that maps each requested bit number onto a uint8 array of the
+    bit values of a DCH waveform. All the bits are extracted in a single pass through
+    the codes.
+
+    Parameters:
+        codes (numpy.ndarray): The 16-bit DCH codes downloaded from the instrument.
+        bits (iterable): The bit numbers to extract. (default: range(8))
+        packed (bool): Optionally pack eight samples into each byte of the results
+            with numpy.packbits (little bit order). (default: False)
+    """
+    codes = _unsigned_codes(codes)
+    size = codes.size
+    out_size = (size + 7) // 8 if packed else size
+    results = {bit: np.empty(out_size, dtype=np.uint8) for bit in bits}
+
+    # The words and bit values of each block stay in the cache while every bit is
+    # extracted, so the codes are only read from memory once
+    words = np.empty(BLOCK_SIZE, dtype=np.uint8)
+    values = np.empty(BLOCK_SIZE, dtype=np.uint8)
+    for start in range(0, size, BLOCK_SIZE):
+        block = codes[start : start + BLOCK_SIZE]
+        block_words = np.take(DIGITAL_LUT, block, out=words[: block.size])
+        for bit, result in results.items():
+            if packed:
+                block_values = values[: block.size]
+            else:
+                block_values = result[start : start + block.size]
+            np.right_shift(block_words, bit, out=block_values)
+            np.bitwise_and(block_values, 1, out=block_values)
+            if packed:
+                result[start // 8 : (start + block.size + 7) // 8] = np.packbits(
+                    block_values, bitorder="little"
+                )
+    return results
+
+
+def min_max_envelope(data, bin_size):
+    """
+    Returns an array with one row per bin of bin_size samples, containing the minimum
+    and the maximum of the bin. The last bin may contain fewer samples.
+
+    Parameters:
+        data (numpy.ndarray): The waveform data.
+        bin_size (int): The number of samples in each bin.
+    """
+    data = np.asarray(data).reshape(-1)
+    full = data.size - data.size % bin_size
+    bins = data[:full].reshape(-1, bin_size)
+    result = np.empty(((data.size + bin_size - 1) // bin_size, 2), dtype=data.dtype)
+    np.min(bins, axis=1, out=result[: len(bins), 0])
+    np.max(bins, axis=1, out=result[: len(bins), 1])
+    if full < data.size:
+        result[-1] = data[full:].min(), data[full:].max()
+    return result
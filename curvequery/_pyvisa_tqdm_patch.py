@@ -4,15 +4,16 @@ from typing import Callable
 from typing import Iterable
 from typing import Optional
 from typing import Sequence
+from typing import Tuple
 from typing import Type
 from typing import Union
 
+import numpy as np
 from pyvisa import constants
 from pyvisa import errors
 from pyvisa import logger
 from pyvisa import util
 
-
 # This file contains modified versions of methods from the pyvisa package
 # module. The modifications enable support for the tqdm progress bar. These
 # methods are dynamically patched (isn't Python wonderful) into a message-based
@@ -68,7 +69,7 @@ def read_bytes_progress_bar(
                     status,
                 )
                 chunk, status = self.visalib.read(self.session, size)
-                self.progress_bar(len(chunk))
+                self.progress_bar.update(len(chunk))
                 ret.extend(chunk)
                 left_to_read -= len(chunk)
                 if break_on_termchar and (status == success or status == termchar_read):
@@ -223,3 +224,121 @@ def read_binary_values_progress_bar(
         )
     except ValueError as e:
         raise errors.InvalidBinaryFormat(e.args[0])
+
+
+# The reader below is not copied from pyvisa. It reads an IEEE 488.2 definite
+# length block straight into a buffer of the exact block size, instead of growing a
+# bytearray chunk by chunk and then copying it again to decode the values.
+
+
+def _read_exact_progress_bar(
+    self, buffer: memoryview, chunk_size: int, update_progress: bool = True
+) -> None:
+    """Fill the buffer with bytes read from the instrument, in chunks of at most
+    chunk_size bytes, optionally updating the progress bar after each chunk."""
+    filled = 0
+    status = None
+    while filled < len(buffer):
+        size = min(chunk_size, len(buffer) - filled)
+        logger.debug(
+            "%s - reading %d bytes (last status %r)",
+            self._resource_name,
+            size,
+            status,
+        )
+        chunk, status = self.visalib.read(self.session, size)
+        buffer[filled : filled + len(chunk)] = chunk
+        filled += len(chunk)
+        if update_progress:
+            self.progress_bar.update(len(chunk))
+
+
+def _parse_ieee_header(received: bytes) -> Optional[Tuple[int, int]]:
+    """Returns the offset of the data and the data length of the definite length
+    block that starts in the received bytes, or None if more bytes are needed to
+    parse its header. Anything received before the start of the block is skipped."""
+    start = received.find(b"#")
+    if start < 0 or len(received) < start + 2:
+        return None
+    digits = received[start + 1 : start + 2]
+    if not digits.isdigit() or digits == b"0":
+        raise errors.InvalidBinaryFormat(
+            "Expected a definite length block, not #{}".format(digits)
+        )
+    offset = start + 2 + int(digits)
+    if len(received) < offset:
+        return None
+    return offset, int(received[start + 2 : offset])
+
+
+def read_ieee_block_progress_bar(
+    self,
+    datatype: util.BINARY_DATATYPES = "h",
+    is_big_endian: bool = False,
+    expect_termination: bool = True,
+    chunk_size: Optional[int] = None,
+) -> np.ndarray:
+    """Read an IEEE 488.2 definite length binary block from the device and return
+    its values as a numpy array that is a view of the received buffer.
+
+    The block header is parsed from the first chunk, so a single buffer of exactly
+    the block size is allocated and each later chunk is read into its place in the
+    buffer. Only the data bytes are counted by the progress bar.
+
+    Parameters
+    ----------
+    datatype : BINARY_DATATYPES, optional
+        Format string for a single element. See struct module. 'h' by default.
+    is_big_endian : bool, optional
+        Are the data in big or little endian order. Defaults to False.
+    expect_termination : bool, optional
+        When set to True, the read termination sent after the block is read
+        and discarded. Defaults to True.
+    chunk_size : int, optional
+        Size of the chunks to read from the device. Defaults to None, meaning
+        the resource wide set value is used.
+
+    Returns
+    -------
+    np.ndarray
+        Data read from the device.
+
+    """
+    chunk_size = chunk_size or self.chunk_size
+
+    with self.ignore_warning(
+        constants.StatusCode.success_device_not_present,
+        constants.StatusCode.success_max_count_read,
+    ):
+        # The header and the first part of the data arrive in the same chunk, so
+        # the header costs no read of its own
+        received = b""
+        header = None
+        while header is None:
+            chunk, _ = self.visalib.read(self.session, chunk_size)
+            received += chunk
+            header = _parse_ieee_header(received)
+        offset, data_length = header
+
+        dtype = np.dtype(datatype).newbyteorder(">" if is_big_endian else "<")
+        if data_length % dtype.itemsize:
+            raise errors.InvalidBinaryFormat(
+                "Block length {} is not a multiple of the {} byte element "
+                "size".format(data_length, dtype.itemsize)
+            )
+
+        # Copy the data received with the header, then read the rest into place
+        buffer = bytearray(data_length)
+        head = memoryview(received)[offset : offset + data_length]
+        buffer[: len(head)] = head
+        self.progress_bar.update(len(head))
+        _read_exact_progress_bar(self, memoryview(buffer)[len(head) :], chunk_size)
+
+        if expect_termination and self._read_termination is not None:
+            extra = len(received) - offset - len(head)
+            termination = bytearray(max(len(self._read_termination) - extra, 0))
+            _read_exact_progress_bar(
+                self, memoryview(termination), len(termination), False
+            )
+
+    return np.frombuffer(buffer, dtype=dtype)
@@ -1,5 +1,24 @@
+from collections import namedtuple
+from time import time
+
+import numpy as np
+import pyvisa
+from tqdm import tqdm
+
 from .api_types import WaveformCollection
 from .api_types import Waveform
+from .api_types import TransferStats
+from .api_types import StateCache
+from ._tek_series_mso import Window
+from ._tek_series_mso import window_indices
+from ._tek_series_mso import get_event_queue
+from ._tek_series_mso import query_many
+from ._tek_series_mso import write_many
+from ._tek_series_mso import get_state_cache
+from ._tek_series_mso import invalidate_state_cache
+from ._tek_series_mso import open_session
+from ._tek_series_mso_curve_feat import TekSeriesCurveFeat
+from ._post_process import scale_analog
 
 FORMATTER_LOOKUP = {  # number of bytes, then signedness
     "1": {"RI": "b", "RP": "B"},
@@ -8,86 +27,263 @@ FORMATTER_LOOKUP = {  # number of bytes, then signedness
     "8": {"RI": "q", "RP": "Q", "FP": "d"},
 }
 
+# The commands that select the transfer encoding of each supported encoding
+ENCODINGS = {
+    "binary": ["DATa:ENCdg RIBinary", "DATa:WIDth 2"],
+    "ascii": ["DATa:ENCdg ASCIi"],
+}
+
+# The waveform output preamble fields that only change when the instrument is set up
+PREAMBLE_QUERIES = [
+    "WFMOutpre:BYT_Nr?",
+    "WFMOutpre:BN_Fmt?",
+    "WFMOutpre:BYT_Or?",
+    "WFMOutpre:ENCdg?",
+    "WFMOutpre:NR_Pt?",
+    "WFMOutpre:XINcr?",
+    "WFMOutpre:PT_Off?",
+    "WFMOutpre:XUNit?",
+    "WFMOutpre:YMUlt?",
+    "WFMOutpre:YOFf?",
+    "WFMOutpre:YZEro?",
+]
+
+Preamble = namedtuple(
+    "Preamble",
+    [
+        "byt_nr",
+        "bn_fmt",
+        "byt_or",
+        "encoding",
+        "nr_pt",
+        "x_incr",
+        "pt_off",
+        "x_unit",
+        "y_mult",
+        "y_off",
+        "y_zero",
+        "y_scale",
+    ],
+)
 
-class Tek3k4kCurveFeat(FeatureBase):
-    """Returns a WaveformCollection object containing waveform data available on the instrument"""
 
-    def action_fcn(self, instr, *, verbose=False, **kwargs):
-        """should store connection"""
-        # self.data = []
-        # self.active_source = ""
-        result = WaveformCollection()
-        instr.write("verbose OFF;header OFF")
+class Tek3k4kCurveFeat(TekSeriesCurveFeat):
+    def feature(
+        self,
+        *,
+        use_pbar=True,
+        verbose=False,
+        as_ndarray=False,
+        dtype=np.float64,
+        encoding="binary",
+        sources=None,
+        start=None,
+        stop=None,
+    ):
+        """
+        Returns a WaveformCollection object containing waveform data of the sources
+        that are turned on in an MDO3000 or MDO4000C series instrument.
 
-        # iterate through all available sources
-        for ch, ch_data, x_scale, y_scale in self._get_data(
-            instr, self._list_sources(instr), **kwargs
-        ):
-            if verbose:
-                print(ch)
-            result.data[ch] = Waveform(ch_data, x_scale, y_scale)
+        Parameters:
+            use_pbar (bool): Optionally display a progress bar. (default: True)
+            verbose (bool): Display additional information
+            as_ndarray (bool): Optionally return the waveform data as numpy.ndarray
+                objects instead of lists. (default: False)
+            dtype (numpy.dtype): The floating point data type of the scaled waveform
+                data. (default: numpy.float64)
+            encoding (str): The transfer encoding of the waveform data. "binary"
+                sends 2 bytes per sample, "ascii" sends comma separated values
+                that take several times longer to transfer. (default: "binary")
+            sources (list or None): The names of the sources to download, such as
+                "CH1", "MATH" or "D0". If None, download all sources that are turned
+                on. (default: None)
+            start (int or None): The index of the first sample to download. If None,
+                start at the first sample of the record. (default: None)
+            stop (int or None): The index one past the last sample to download. If
+                None, stop at the end of the record. (default: None)
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError(
+                "encoding must be 'binary' or 'ascii', not {!r}".format(encoding)
+            )
+        with open_session(self.resource_manager, self.resource_name) as inst:
+            inst.state_cache = get_state_cache(self.resource_name)
+            result = WaveformCollection()
+            download_start = time()
+
+            # Responses are parsed by position, so they must not include headers
+            write_many(inst, ["HEADer OFF", "VERBose ON"] + ENCODINGS[encoding])
+            try:
+                result.idn, enabled, rec_len = self._list_sources(inst)
+                first, stop = window_indices(
+                    Window(start, stop, None, None), None, rec_len
+                )
+                for ch, wave in self._get_data(
+                    inst,
+                    self._select_sources(enabled, sources),
+                    use_pbar,
+                    dtype,
+                    encoding,
+                    first,
+                    stop,
+                ):
+                    if verbose:
+                        print(ch)
+                    result.data[ch] = self._convert(wave, as_ndarray)
+            except pyvisa.errors.VisaIOError as error:
+                # Keep the events with the exception so callers can report them
+                error.events = get_event_queue(inst)
+                invalidate_state_cache(self.resource_name)
+                raise
+            result.transfer_stats = TransferStats(
+                getattr(inst, "bytes_transferred", 0), time() - download_start
+            )
         return result
 
     @staticmethod
-    def _list_sources(connection):
-        """Returns a list of channel name strings that we could query"""
-        connection.write("verbose ON;header ON")
-        result_string = connection.query("select?")
-        connection.write("verbose OFF;header OFF")
-        result_string = result_string.replace(":SELECT:", "", 1)
-        result_string = result_string[0 : result_string.find(";CONTROL ")]
-        # split on semicolons and ignore the second (on/off) part of each.
-        # Remove busses because that's wrong
-        ret_val = filter(
-            lambda source: "BUS" not in source,
-            [entry.split(" ")[0] for entry in result_string.split(";")],
+    def _parse_select(response):
+        """Returns the names of the sources that are turned on, parsed from the
+        response to a select? query with headers enabled"""
+        response = response.strip().replace(":SELECT:", "", 1)
+        if ";CONTROL " in response:
+            response = response[0 : response.index(";CONTROL ")]
+        # Each entry is a source name and its on/off state. Busses are not waveforms.
+        entries = [entry.split(" ") for entry in response.split(";")]
+        return [name for name, state in entries if state == "1" and "BUS" not in name]
+
+    def _list_sources(self, instr):
+        """Returns the Identity of the instrument, the names of the sources that are
+        turned on and the record length, queried in a single round trip"""
+        response = query_many(
+            instr,
+            [
+                "*IDN?",
+                "HEADer ON",
+                "SELect?",
+                "HEADer OFF",
+                "HORizontal:RECOrdlength?",
+            ],
+            StateCache.CONFIGURATION,
+        )
+        return (
+            self._parse_identity(response[0]),
+            self._parse_select(";".join(response[1:-1])),
+            int(response[-1]),
         )
-        return ret_val
+
+    @classmethod
+    def _parse_preamble(cls, responses):
+        """Returns a Preamble parsed from the responses to PREAMBLE_QUERIES, followed
+        by the scale and position of the source if it is a channel"""
+        (
+            byt_nr,
+            bn_fmt,
+            byt_or,
+            encoding,
+            nr_pt,
+            x_incr,
+            pt_off,
+            x_unit,
+            y_mult,
+            y_off,
+            y_zero,
+        ) = responses[: len(PREAMBLE_QUERIES)]
+        y_scale = None
+        if len(responses) > len(PREAMBLE_QUERIES):
+            y_scale = cls._parse_yscale(*responses[len(PREAMBLE_QUERIES) :])
+        return Preamble(
+            byt_nr,
+            bn_fmt,
+            byt_or,
+            encoding,
+            int(nr_pt),
+            float(x_incr),
+            float(pt_off),
+            x_unit,
+            float(y_mult),
+            float(y_off),
+            float(y_zero),
+            y_scale,
+        )
+
+    def _get_preamble(self, instr, source, encoding, first, stop):
+        """Returns the Preamble of the source. If the instr object has a state cache,
+        the preamble is parsed once per configuration."""
+        cache = getattr(instr, "state_cache", None)
+        preambles = cache.metadata[StateCache.CONFIGURATION] if cache else {}
+        key = "WFMOutpre? {} {} {} {}".format(source, encoding, first, stop)
+        if key not in preambles:
+            write_many(instr, ["DATa:SOUrce {}".format(source)])
+            queries = list(PREAMBLE_QUERIES)
+            if source.startswith("CH"):
+                queries += ["{}:SCAle?".format(source), "{}:POSition?".format(source)]
+            preambles[key] = self._parse_preamble(query_many(instr, queries))
+        return preambles[key]
 
     @staticmethod
-    def _get_header(connection, source):
-        """Returns the header as a dictionary so you can see configuration details"""
-        connection.write("data:source " + source)
-        connection.write("verbose ON;header ON")
-        result_string = connection.query("wfmoutpre?")
-        connection.write("verbose OFF;header OFF")
-        result_string = result_string.replace(":WFMOUTPRE:", "", 1)
-        # split on semicolons and break those into key/value pairs by splitting on space
-        return {x.split(" ")[0]: x.split(" ")[1] for x in result_string.split(";")}
-
-    def _get_data(self, connection, sources, lower_bound=None, upper_bound=None):
-        """queries data and returns it along with the corresponding header"""
+    def _read_codes(instr, preamble):
+        """Issue the curve query command and return the waveform codes sent by the
+        instrument as an ndarray"""
+        if preamble.encoding == "ASCII":
+            response = instr.query("CURVe?")
+            codes = np.array(response.split(","), dtype=np.float64)
+            instr.progress_bar.update(int(preamble.byt_nr) * preamble.nr_pt)
+            instr.bytes_transferred += len(response)
+        else:
+            instr.write("CURVe?")
+            codes = instr.read_ieee_block_progress_bar(
+                datatype=FORMATTER_LOOKUP[preamble.byt_nr][preamble.bn_fmt],
+                is_big_endian=preamble.byt_or == "MSB",
+                expect_termination=True,
+            )
+            instr.bytes_transferred += codes.nbytes
+        return codes
+
+    def _get_data(self, instr, sources, use_pbar, dtype, encoding, first, stop):
+        """Returns an iterator that yields a (source, Waveform) tuple for each source,
+        downloading the samples from index first up to index stop"""
+        write_many(
+            instr, ["DATa:STARt {}".format(first + 1), "DATa:STOP {}".format(stop)]
+        )
+
+        # The preambles give the size of each transfer before any data is downloaded
+        preambles = {}
         for source in sources:
-            connection.write("data:source " + source)
-            if lower_bound is None:
-                connection.write("data:start 1")
-            else:
-                connection.write("data:start " + str(lower_bound))
-            length = connection.query("horizontal:recordlength?")
-            if upper_bound is None:
-                connection.write("data:stop " + length)
-            else:
-                connection.write("data:stop " + str(upper_bound))
-
-            header = self._get_header(connection, source)
-            if connection.query("select:" + source + "?")[0] == "0":
-                # The channel we want to read is off. Just return empty data and the header
-                return [], header
-            y_mult = float(header["YMULT"])
-            y_offset = float(header["YOFF"])
-            y_zero = float(header["YZERO"])
-            ret_val = []
-            if header["ENCDG"] == "ASCII":
-                read_string = connection.query("curve?")
-                ret_val = [
-                    ((float(entry) - y_offset) * y_mult) + y_zero
-                    for entry in read_string.split(",")
-                ]
-            elif header["ENCDG"] == "BINARY":
-                format_string = FORMATTER_LOOKUP[header["BYT_NR"]][header["BN_FMT"]]
-                is_big_endian = header["BYT_OR"] == "MSB"
-                ret_val = connection.query_binary_values(
-                    "curv?", datatype=format_string, is_big_endian=is_big_endian
-                )
-                ret_val = [((entry - y_offset) * y_mult) + y_zero for entry in ret_val]
-            yield (source, ret_val, None, None)
+            preambles[source] = self._get_preamble(instr, source, encoding, first, stop)
+
+        # remember the state of the acquisition system and then stop acquiring waveforms
+        acq_state = self._stop_acquisition(instr)
+
+        try:
+            with tqdm(
+                unit="B",
+                total=sum(int(i.byt_nr) * i.nr_pt for i in preambles.values()),
+                disable=not use_pbar,
+                unit_scale=True,
+                desc="Downloading",
+            ) as t:
+                self._patch_progress_bar(instr, t)
+                for source, preamble in preambles.items():
+                    write_many(instr, ["DATa:SOUrce {}".format(source)])
+
+                    # The time of the first sample can change with each acquisition.
+                    # It describes the whole record, so the horizontal offset is
+                    # moved to the first downloaded sample, like the MSO features.
+                    x_zero = query_many(instr, ["WFMOutpre:XZEro?"])[0]
+                    x_scale = self._parse_xscale(
+                        preamble.x_incr, preamble.pt_off, x_zero, preamble.x_unit
+                    )
+                    x_scale = x_scale._replace(
+                        offset=x_scale.offset + first * x_scale.slope
+                    )
+                    data = scale_analog(
+                        self._read_codes(instr, preamble),
+                        preamble.y_mult,
+                        preamble.y_zero,
+                        preamble.y_off,
+                        dtype=dtype,
+                    )
+                    yield source, Waveform(data, x_scale, preamble.y_scale)
+        finally:
+            # Restore the acquisition state, even if a download fails
+            self._restore_acquisition(instr, acq_state)
@@ -1,12 +1,39 @@
+import math
 from collections import namedtuple
+from contextlib import contextmanager
 from enum import Enum
 from enum import unique
 from time import sleep
 
+from .api_types import StateCache
+
 
 UNLOCK_DELAY = 0.01
 MAX_EVENTS = 33
 
+# Limits of the automatically selected VISA chunk size (in bytes)
+MIN_CHUNK_SIZE = 20 * 1024
+MAX_CHUNK_SIZE = 1024 * 1024
+
+# The link throughput (in bytes per second) assumed before one has been measured,
+# the weight of each new measurement, and the factor applied to the expected
+# transfer time when the VISA timeout is selected automatically
+DEFAULT_THROUGHPUT = 1e6
+THROUGHPUT_WEIGHT = 0.5
+TIMEOUT_MARGIN = 2.0
+
+# The fraction of a sample interval by which a window time may miss a sample
+WINDOW_TOLERANCE = 1e-6
+
+# The StateCache objects of the resources that have a state cache enabled
+_STATE_CACHES = {}
+
+# The open sessions of the resources that have a persistent session
+_SESSIONS = {}
+
+# The measured link throughput of each resource, in bytes per second
+_THROUGHPUTS = {}
+
 
 @unique
 class WaveType(Enum):
@@ -20,6 +47,150 @@ JobParameters = namedtuple(
     ["wave_type", "channel_name", "encoding", "bit_nr", "data_type", "record_length"],
 )
 
+ProcessOptions = namedtuple(
+    "ProcessOptions",
+    ["decompose_dch", "dtype", "raw", "pack_bits", "bit_nr"],
+    defaults=[16],
+)
+
+TransferTuning = namedtuple("TransferTuning", ["chunk_size", "timeout", "throughput"])
+
+Window = namedtuple("Window", ["start", "stop", "start_time", "stop_time"])
+
+
+def _compound(commands):
+    """Joins commands into a single compound command. Every command after the first
+    is prefixed with a colon so that it is interpreted from the root of the command
+    tree."""
+    return ";".join(
+        [commands[0]] + [":" + command.lstrip(":") for command in commands[1:]]
+    )
+
+
+@contextmanager
+def open_session(resource_manager, resource_name):
+    """Returns a context manager that provides a session with the resource. If a
+    persistent session is open for the resource, it is reused and left open."""
+    inst = _SESSIONS.get(resource_name)
+    if inst is not None:
+        yield inst
+    else:
+        with resource_manager.open_resource(resource_name) as inst:
+            yield inst
+
+
+@contextmanager
+def persistent_session(resource_manager, resource_name):
+    """Returns a context manager that keeps a session with the resource open while it
+    is active, so that open_session() reuses it instead of opening a new one"""
+    if resource_name in _SESSIONS:
+        yield _SESSIONS[resource_name]
+        return
+    with resource_manager.open_resource(resource_name) as inst:
+        _SESSIONS[resource_name] = inst
+        try:
+            yield inst
+        finally:
+            del _SESSIONS[resource_name]
+
+
+def window_indices(window, x_scale, rec_len):
+    """Returns the first index and the stop index (one past the last) of the samples
+    of a record inside the window. Sample indices and times can be combined; the
+    narrowest bounds are used."""
+    first, stop = 0, rec_len
+    if window.start is not None:
+        first = max(first, window.start)
+    if window.stop is not None:
+        stop = min(stop, window.stop)
+    # Times that fall on a sample, apart from rounding errors, include that sample
+    if window.start_time is not None:
+        position = (window.start_time - x_scale.offset) / x_scale.slope
+        first = max(first, math.ceil(position - WINDOW_TOLERANCE))
+    if window.stop_time is not None:
+        position = (window.stop_time - x_scale.offset) / x_scale.slope
+        stop = min(stop, math.floor(position + WINDOW_TOLERANCE) + 1)
+    if first >= stop:
+        raise ValueError("The window does not contain any samples of the record")
+    return first, stop
+
+
+def get_throughput(resource_name):
+    """Returns the measured link throughput of the resource in bytes per second, or
+    DEFAULT_THROUGHPUT if it has not been measured"""
+    return _THROUGHPUTS.get(resource_name, DEFAULT_THROUGHPUT)
+
+
+def update_throughput(resource_name, transfer_stats):
+    """Updates the exponential moving average of the link throughput of the resource
+    with the rate of a transfer"""
+    if transfer_stats.bytes and transfer_stats.seconds:
+        previous = _THROUGHPUTS.get(resource_name, transfer_stats.rate)
+        _THROUGHPUTS[resource_name] = (
+            THROUGHPUT_WEIGHT * transfer_stats.rate + (1 - THROUGHPUT_WEIGHT) * previous
+        )
+
+
+def auto_chunk_size(block_bytes):
+    """Returns a VISA chunk size for reading a block of the given size. Large chunks
+    cost fewer read calls, but are limited so the progress bar keeps updating."""
+    return min(max(block_bytes, MIN_CHUNK_SIZE), MAX_CHUNK_SIZE)
+
+
+def auto_timeout(timeout, block_bytes, throughput):
+    """Returns a VISA timeout (in ms) that extends the timeout by the expected time
+    to transfer a block of the given size, with a safety margin. A timeout of None
+    (wait indefinitely) is returned unchanged."""
+    if timeout is None:
+        return None
+    return timeout + int(1000 * TIMEOUT_MARGIN * block_bytes / throughput)
+
+
+def get_state_cache(resource_name):
+    """Returns the StateCache object enabled for the resource, or None"""
+    return _STATE_CACHES.get(resource_name)
+
+
+def enable_state_cache(resource_name, enable=True):
+    """Enables or disables the StateCache object of the resource"""
+    if enable:
+        return _STATE_CACHES.setdefault(resource_name, StateCache())
+    _STATE_CACHES.pop(resource_name, None)
+
+
+def invalidate_state_cache(resource_name, scope=None):
+    """Invalidates the StateCache object of the resource, if it is enabled"""
+    cache = get_state_cache(resource_name)
+    if cache is not None:
+        cache.invalidate(scope)
+
+
+def query_many(instr, queries, scope=None):
+    """Sends several queries as a single compound query and returns a list of the
+    stripped responses. This costs one round trip instead of one per query.
+
+    If a scope is given and the instr object has a state cache, the response is
+    cached as metadata of that scope and later calls do not query the instrument."""
+    command = _compound(queries)
+    cache = getattr(instr, "state_cache", None)
+    if scope is None or cache is None:
+        response = instr.query(command)
+    elif command in cache.metadata[scope]:
+        response = cache.metadata[scope][command]
+    else:
+        response = cache.metadata[scope][command] = instr.query(command)
+    return [i.strip() for i in response.strip().split(";")]
+
+
+def write_many(instr, commands):
+    """Sends several commands as a single compound command. If the instr object has a
+    state cache, commands that would not change the instrument are skipped."""
+    cache = getattr(instr, "state_cache", None)
+    if cache is not None:
+        commands = cache.filter_writes(commands)
+    if commands:
+        instr.write(_compound(commands))
+
 
 def get_event_queue(instr, verbose=True):
     """This function queries events from the Event Queue and optionally prints the events on stdout"""
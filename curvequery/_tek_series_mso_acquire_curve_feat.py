@@ -0,0 +1,162 @@
+from itertools import count as counter
+
+import numpy as np
+import pyvisa
+from tqdm import tqdm
+
+from .api_types import WaveformCollection
+from .api_types import TransferStats
+from .api_types import SequenceTimeout
+from .api_types import StateCache
+from ._tek_series_mso import ProcessOptions
+from ._tek_series_mso import get_event_queue
+from ._tek_series_mso import get_state_cache
+from ._tek_series_mso import invalidate_state_cache
+from ._tek_series_mso import open_session
+from ._tek_series_mso_acquire_feat import _wait_opc
+from ._tek_series_mso_curve_feat import TekSeriesCurveFeat
+
+
+class TekSeriesAcquireCurveFeat(TekSeriesCurveFeat):
+    def feature(
+        self,
+        *,
+        count=None,
+        timeout=None,
+        restore_state=True,
+        overlap=True,
+        use_pbar=False,
+        decompose_dch=True,
+        as_ndarray=False,
+        dtype=np.float64,
+        raw=False,
+        pack_bits=False,
+        bit_nr=16,
+    ):
+        """
+        Returns a generator object that runs a single sequence of the acquisition
+        system for each iteration and yields a WaveformCollection object containing
+        the waveform data of that sequence. A single session is used for the whole
+        loop.
+
+        Parameters:
+            count (int or None): The number of acquisitions to sequence. If None,
+                sequence acquisitions indefinitely. (default: None)
+            timeout (int or None): The number of seconds to wait for an acquisition to
+                complete. If None, wait indefinitely. (default: None)
+            restore_state (bool): Optionally save and restore the acquisition state of
+                the instrument. (default: True)
+            overlap (bool): Optionally arm the next sequence as soon as the waveform
+                data has been transferred, so the instrument acquires while the data
+                is post processed and the WaveformCollection is used by the caller.
+                (default: True)
+            use_pbar (bool): Optionally display a progress bar for each download.
+                (default: False)
+            decompose_dch (bool): Optionally convert a DCH channel into eight separate
+                1-bit channels. (default: True)
+            as_ndarray (bool): Optionally return the waveform data as numpy.ndarray
+                objects instead of lists. (default: False)
+            dtype (numpy.dtype): The floating point data type of scaled analog
+                waveform data. (default: numpy.float64)
+            raw (bool): Optionally return analog waveforms as RawWaveform objects.
+                (default: False)
+            pack_bits (bool): Optionally return decomposed DCH bits as PackedWaveform
+                objects. (default: False)
+            bit_nr (int or str): The number of bits per sample of analog waveform
+                transfers: 8, 16 or "auto". (default: 16)
+        """
+        options = ProcessOptions(decompose_dch, dtype, raw, pack_bits, bit_nr)
+        with open_session(self.resource_manager, self.resource_name) as inst:
+            inst.state_cache = get_state_cache(self.resource_name)
+
+            # Save the state of the acquisition system
+            acq_stopafter = inst.query("ACQUIRE:STOPAFTER?").strip()
+            acq_state = inst.query("ACQUIRE:STATE?").strip()
+            inst.write("ACQUIRE:STATE STOP")
+
+            armed = False
+            try:
+                for i in counter(1):
+                    if count is not None and i > count:
+                        break
+
+                    # Without overlap, or on the first sequence, arm the sequence now
+                    if not armed:
+                        self._arm(inst)
+                    if not _wait_opc(inst, timeout):
+                        raise SequenceTimeout(
+                            "Acquisition sequence number {} did not complete".format(i)
+                        )
+                    armed = False
+
+                    # The new acquisition may have changed the available waveforms
+                    invalidate_state_cache(self.resource_name, StateCache.ACQUISITION)
+
+                    # Only the curve queries are timed, like the curve feature
+                    sources = self._list_sources(inst)
+                    transfers = self._transfer_sources(inst, sources, use_pbar, bit_nr)
+                    transfer_stats = TransferStats(
+                        inst.bytes_transferred, inst.transfer_seconds
+                    )
+
+                    # The waveform data is on the host, so the instrument can acquire
+                    # the next sequence while the data is processed
+                    if overlap and (count is None or i < count):
+                        self._arm(inst)
+                        armed = True
+
+                    result = WaveformCollection()
+                    result.transfer_stats = transfer_stats
+                    for source, (wave_type, source_data, x_scale, y_info) in transfers:
+                        for ch, wave in self._post_process(
+                            wave_type,
+                            sources,
+                            source,
+                            source_data,
+                            x_scale,
+                            y_info,
+                            options,
+                        ):
+                            result.data[ch] = self._convert(wave, as_ndarray)
+                    yield result
+
+            except pyvisa.errors.VisaIOError as error:
+                # Keep the events with the exception so callers can report them
+                error.events = get_event_queue(inst)
+                invalidate_state_cache(self.resource_name)
+                raise
+
+            # Restore the acquisition state, even if the generator is closed early
+            finally:
+                if armed:
+                    inst.write("ACQUIRE:STATE STOP")
+                if restore_state:
+                    inst.write(
+                        "ACQUIRE:STOPAFTER {};:ACQUIRE:STATE {}".format(
+                            acq_stopafter, acq_state
+                        )
+                    )
+
+    @staticmethod
+    def _arm(instr):
+        """Starts a single sequence of the acquisition system"""
+        instr.write("ACQUIRE:STOPAFTER SEQUENCE;:ACQUIRE:STATE RUN")
+
+    def _transfer_sources(self, instr, sources, use_pbar, bit_nr=16):
+        """Downloads the data of each source and returns a list of (source, (wave_type,
+        source_data, x_scale, y_info)) tuples"""
+        jobs = self._make_jobs(instr, sources, bit_nr)
+        transfers = []
+        with tqdm(
+            desc="Downloading",
+            unit="B",
+            total=self._total_bytes(jobs),
+            disable=not use_pbar,
+            unit_scale=True,
+        ) as t:
+            self._patch_progress_bar(instr, t)
+            for source in jobs:
+                transfer = self._transfer_source(instr, source, jobs)
+                if transfer is not None:
+                    transfers.append((source, transfer))
+        return transfers
@@ -1,13 +1,21 @@
 from time import time
 from time import sleep
 
+import pyvisa
 from visadore import base
 
 from .api_types import SequenceTimeout
+from .api_types import StateCache
+from ._tek_series_mso import invalidate_state_cache
+from ._tek_series_mso import open_session
+
+# The first and largest delays (in seconds) between polls of the acquisition state
+MIN_POLL_DELAY = 0.001
+MAX_POLL_DELAY = 0.1
 
 
 class TekSeriesAcquireFeat(base.FeatureBase):
-    def feature(self, *, count=None, timeout=None, restore_state=True):
+    def feature(self, *, count=None, timeout=None, restore_state=True, wait="opc"):
         """
         Returns a generator object that runs a single sequence of the acquisition
             system for each iteration. If the count argument evaluates as True, the
@@ -20,7 +28,13 @@ class TekSeriesAcquireFeat(base.FeatureBase):
                 complete. If None, wait indefinitely. (default: None)
             restore_state (bool): Optionally save and restore the acquisition state of the
                 instrument. (default: True)
+            wait (str): How to wait for a sequence to complete. "opc" blocks on an
+                *OPC? query that the instrument answers when the sequence completes.
+                "poll" polls the acquisition state, starting with a short delay that
+                backs off up to 100 ms. (default: "opc")
         """
+        if wait not in ("opc", "poll"):
+            raise ValueError("wait must be 'opc' or 'poll', not {!r}".format(wait))
 
         def restore(instr, enabled, stop_after, state):
             """This helper function restores the acquisition state, if enabled"""
@@ -28,7 +42,7 @@ class TekSeriesAcquireFeat(base.FeatureBase):
                 instr.write("ACQUIRE:STOPAFTER {}".format(stop_after))
                 instr.write("ACQUIRE:STATE {}".format(state))
 
-        with self.resource_manager.open_resource(self.resource_name) as inst:
+        with open_session(self.resource_manager, self.resource_name) as inst:
 
             # Save the state of the acquisition system
             acq_stopafter = inst.query("ACQUIRE:STOPAFTER?")
@@ -41,35 +55,32 @@ class TekSeriesAcquireFeat(base.FeatureBase):
 
         # Main loop
         while True:
-            with self.resource_manager.open_resource(self.resource_name) as inst:
+            with open_session(self.resource_manager, self.resource_name) as inst:
                 if isinstance(count, int):
                     i += 1
-                    inst.write("ACQUIRE:STOPAFTER SEQUENCE")
-                    inst.write("ACQUIRE:STATE RUN")
-
-                # Timeout loop to ensure the acquisition does not hang up
-                start_time = time()
-                while True:
-
-                    # If the sequence is complete then stop waiting
-                    if inst.query("ACQUIRE:STATE?").strip() == "0":
-                        break
-
-                    # If the acquisition is taking to long, raise an exception
-                    if (timeout is not None) and time() - start_time > timeout:
-                        restore(inst, restore_state, acq_stopafter, acq_state)
-                        if count:
-                            msg = "Acquisition sequence number {} did not complete".format(
-                                i
-                            )
-                        else:
-                            msg = "Acquisition sequence did not complete"
-                        raise SequenceTimeout(msg)
-
-                    # wait a bit and then check again
-                    sleep(0.1)
+                    inst.write("ACQUIRE:STOPAFTER SEQUENCE;:ACQUIRE:STATE RUN")
+
+                # Wait for the sequence to complete, but not longer than the timeout
+                if isinstance(count, int) and wait == "opc":
+                    complete = _wait_opc(inst, timeout)
+                else:
+                    complete = _wait_poll(inst, timeout)
+
+                # If the acquisition took too long, raise an exception
+                if not complete:
+                    restore(inst, restore_state, acq_stopafter, acq_state)
+                    if count:
+                        msg = "Acquisition sequence number {} did not complete".format(
+                            i
+                        )
+                    else:
+                        msg = "Acquisition sequence did not complete"
+                    raise SequenceTimeout(msg)
 
             # exiting context manager, instrument object is closed
+            # The new acquisition may have changed the available waveforms
+            invalidate_state_cache(self.resource_name, StateCache.ACQUISITION)
+
             # Signal that a new acquisition is ready by sending the current count
             yield i
 
@@ -78,5 +89,38 @@ class TekSeriesAcquireFeat(base.FeatureBase):
                 break
 
         # Restore the acquisition state
-        with self.resource_manager.open_resource(self.resource_name) as inst:
+        with open_session(self.resource_manager, self.resource_name) as inst:
             restore(inst, restore_state, acq_stopafter, acq_state)
+
+
+def _wait_opc(instr, timeout):
+    """Waits for a single sequence to complete with an *OPC? query, which the
+    instrument answers as soon as the sequence is complete. Returns False if the
+    sequence did not complete within the timeout (in seconds, None for no limit)."""
+    visa_timeout = instr.timeout
+    instr.timeout = None if timeout is None else timeout * 1000
+    try:
+        instr.query("*OPC?")
+    except pyvisa.errors.VisaIOError as error:
+        if error.error_code != pyvisa.constants.StatusCode.error_timeout:
+            raise
+        # Discard the pending *OPC? response before the session is used again
+        instr.clear()
+        return False
+    finally:
+        instr.timeout = visa_timeout
+    return True
+
+
+def _wait_poll(instr, timeout):
+    """Polls the acquisition state until the sequence is complete, doubling the delay
+    between polls up to MAX_POLL_DELAY. Returns False if the sequence did not complete
+    within the timeout (in seconds, None for no limit)."""
+    start_time = time()
+    delay = MIN_POLL_DELAY
+    while instr.query("ACQUIRE:STATE?").strip() != "0":
+        if (timeout is not None) and time() - start_time > timeout:
+            return False
+        sleep(delay)
+        delay = min(2 * delay, MAX_POLL_DELAY)
+    return True
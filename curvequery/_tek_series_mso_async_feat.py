@@ -0,0 +1,55 @@
+import asyncio
+from functools import partial
+
+from ._tek_series_mso_acquire_feat import TekSeriesAcquireFeat
+from ._tek_series_mso_curve_feat import TekSeriesCurveFeat
+
+# Returned by next() in the executor when the wrapped generator is exhausted, since
+# StopIteration cannot be raised into a Future
+_EXHAUSTED = object()
+
+
+async def _iterate_in_executor(generator, executor=None):
+    """Returns an asynchronous generator that advances a blocking generator in the
+    executor, so the event loop keeps running while each item is produced"""
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            item = await loop.run_in_executor(executor, next, generator, _EXHAUSTED)
+            if item is _EXHAUSTED:
+                break
+            yield item
+    finally:
+        await loop.run_in_executor(executor, generator.close)
+
+
+class TekSeriesCurveAsyncFeat(TekSeriesCurveFeat):
+    async def feature(self, *, executor=None, **kwargs):
+        """
+        Returns a coroutine that downloads the waveform data available on the
+        instrument in the executor and returns a WaveformCollection object.
+
+        Parameters:
+            executor (concurrent.futures.Executor or None): The executor that runs the
+                download. If None, use the default executor of the event loop.
+                (default: None)
+            kwargs: Additional keyword arguments passed to the curve feature.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, partial(super().feature, **kwargs))
+
+
+class TekSeriesAcquireAsyncFeat(TekSeriesAcquireFeat):
+    def feature(self, *, executor=None, **kwargs):
+        """
+        Returns an asynchronous generator object that runs a single sequence of the
+        acquisition system for each iteration. Each sequence is run and waited for in
+        the executor, so the event loop is never blocked.
+
+        Parameters:
+            executor (concurrent.futures.Executor or None): The executor that runs the
+                acquisitions. If None, use the default executor of the event loop.
+                (default: None)
+            kwargs: Additional keyword arguments passed to the acquire feature.
+        """
+        return _iterate_in_executor(super().feature(**kwargs), executor)
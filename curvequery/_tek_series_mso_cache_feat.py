@@ -0,0 +1,22 @@
+from visadore import base
+
+from ._tek_series_mso import enable_state_cache
+
+
+class TekSeriesStateCacheFeat(base.FeatureBase):
+    def feature(self, enable=True):
+        """
+        Enables or disables a cache of the settings written to the instrument and the
+        metadata read from it, which lets the curve feature skip redundant commands.
+        Returns the StateCache object, or None if the cache is disabled.
+
+        The cache is invalidated by the setup and default_setup features, and its
+        acquisition metadata is invalidated by the acquire feature. Call the
+        invalidate() method of the StateCache object after changing the instrument
+        settings by any other means.
+
+        Parameters:
+            enable (bool): Enable the cache if True, otherwise disable it.
+                (default: True)
+        """
+        return enable_state_cache(self.resource_name, enable)
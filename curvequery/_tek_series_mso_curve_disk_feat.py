@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+import pyvisa
+
+from .api_types import RawWaveform
+from .api_types import WaveformCollection
+from .api_types import TransferStats
+from ._tek_series_mso import ProcessOptions
+from ._tek_series_mso import get_event_queue
+from ._tek_series_mso import get_state_cache
+from ._tek_series_mso import invalidate_state_cache
+from ._tek_series_mso import open_session
+from ._tek_series_mso_curve_feat import TekSeriesCurveStreamFeat
+
+
+class TekSeriesCurveDiskFeat(TekSeriesCurveStreamFeat):
+    def feature(
+        self,
+        directory,
+        *,
+        chunk_size=1000000,
+        use_pbar=True,
+        decompose_dch=True,
+        dtype=np.float64,
+        raw=False,
+        bit_nr=16,
+    ):
+        """
+        Downloads the waveform data available on the instrument into a NPY file for
+        each source in the directory, and returns a WaveformCollection object whose
+        waveform data are numpy.memmap objects of those files. The data is
+        downloaded and written in chunks, so records larger than the memory of the
+        computer can be downloaded. The scales and the identity of the instrument
+        are written into the directory like the save() method of the
+        WaveformCollection object, so WaveformCollection.load() can reopen it.
+
+        Parameters:
+            directory (str): The directory of the NPY files. It is created if it does
+                not exist, and existing files of the same sources are overwritten.
+            chunk_size (int): The maximum number of samples held in memory for each
+                source. (default: 1000000)
+            use_pbar (bool): Optionally display a progress bar. (default: True)
+            decompose_dch (bool): Optionally convert a DCH channel into eight separate
+                1-bit channels. (default: True)
+            dtype (numpy.dtype): The floating point data type of scaled analog
+                waveform data. (default: numpy.float64)
+            raw (bool): Optionally store analog waveforms as the integer codes sent
+                by the instrument and return them as RawWaveform objects.
+                (default: False)
+            bit_nr (int or str): The number of bits per sample of analog waveform
+                transfers: 8, 16 or "auto". (default: 16)
+        """
+        os.makedirs(directory, exist_ok=True)
+        options = ProcessOptions(decompose_dch, dtype, raw, False, bit_nr)
+        with open_session(self.resource_manager, self.resource_name) as inst:
+            inst.state_cache = get_state_cache(self.resource_name)
+            result = WaveformCollection()
+            try:
+                result.idn, available = self._identify_and_list_sources(inst)
+                chunks = self._get_chunks(
+                    inst, available, use_pbar, chunk_size, options
+                )
+                for chunk in chunks:
+                    wave = chunk.waveform
+                    data = wave.raw_data if isinstance(wave, RawWaveform) else wave.data
+
+                    # The first chunk of each source creates its file and waveform,
+                    # whose horizontal scale starts at the first sample
+                    if chunk.start == 0:
+                        memmap = np.lib.format.open_memmap(
+                            os.path.join(directory, chunk.source + ".npy"),
+                            mode="w+",
+                            dtype=data.dtype,
+                            shape=(chunk.record_length,),
+                        )
+                        if isinstance(wave, RawWaveform):
+                            result.data[chunk.source] = wave._replace(raw_data=memmap)
+                        else:
+                            result.data[chunk.source] = wave._replace(data=memmap)
+                    else:
+                        memmap = self._memmap(result[chunk.source])
+                    memmap[chunk.start : chunk.start + len(data)] = data
+            except pyvisa.errors.VisaIOError as error:
+                # Keep the events with the exception so callers can report them
+                error.events = get_event_queue(inst)
+                invalidate_state_cache(self.resource_name)
+                raise
+
+            for wave in result.data.values():
+                self._memmap(wave).flush()
+            result.save_metadata(directory)
+
+            # Only the curve queries are timed, like the curve feature
+            result.transfer_stats = TransferStats(
+                getattr(inst, "bytes_transferred", 0),
+                getattr(inst, "transfer_seconds", 0.0),
+            )
+        return result
+
+    @staticmethod
+    def _memmap(wave):
+        """Returns the memmap object of the waveform"""
+        return wave.raw_data if isinstance(wave, RawWaveform) else wave.data
@@ -1,24 +1,79 @@
 import types
+from collections import deque
+from time import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from functools import reduce
 
 from visadore import base
+import numpy as np
 import pyvisa
 from tqdm import tqdm
 
+from .api_types import Identity
 from .api_types import XScale
 from .api_types import YScale
 from .api_types import WaveformCollection
 from .api_types import Waveform
+from .api_types import RawWaveform
+from .api_types import PackedWaveform
+from .api_types import WaveformChunk
+from .api_types import TransferStats
+from .api_types import StateCache
 from ._tek_series_mso import WaveType
 from ._tek_series_mso import JobParameters
+from ._tek_series_mso import ProcessOptions
+from ._tek_series_mso import TransferTuning
+from ._tek_series_mso import Window
+from ._tek_series_mso import window_indices
 from ._tek_series_mso import get_event_queue
+from ._tek_series_mso import query_many
+from ._tek_series_mso import write_many
+from ._tek_series_mso import get_state_cache
+from ._tek_series_mso import invalidate_state_cache
+from ._tek_series_mso import open_session
+from ._tek_series_mso import get_throughput
+from ._tek_series_mso import update_throughput
+from ._tek_series_mso import auto_chunk_size
+from ._tek_series_mso import auto_timeout
+from ._post_process import scale_analog
+from ._post_process import fits_in_8_bits
+from ._post_process import digital_bits
+from ._post_process import digital_byte
 from ._pyvisa_tqdm_patch import _read_raw_progress_bar
 from ._pyvisa_tqdm_patch import read_binary_values_progress_bar
 from ._pyvisa_tqdm_patch import read_bytes_progress_bar
+from ._pyvisa_tqdm_patch import read_ieee_block_progress_bar
+
+# The approximate number of samples, spread over the record, downloaded to choose the
+# transfer width of an analog source
+PROBE_LENGTH = 10000
 
 
 class TekSeriesCurveFeat(base.FeatureBase):
-    def feature(self, *, use_pbar=True, decompose_dch=True, verbose=False):
+    def feature(
+        self,
+        *,
+        use_pbar=True,
+        decompose_dch=True,
+        verbose=False,
+        as_ndarray=False,
+        dtype=np.float64,
+        raw=False,
+        pack_bits=False,
+        bit_nr=16,
+        pipeline=False,
+        pbar_desc="Downloading",
+        pbar_position=None,
+        chunk_size=None,
+        timeout=None,
+        sources=None,
+        start=None,
+        stop=None,
+        start_time=None,
+        stop_time=None,
+        lazy=False,
+    ):
         """
         Returns a WaveformCollection object containing waveform data available on the
         instrument.
@@ -28,23 +83,120 @@ class TekSeriesCurveFeat(base.FeatureBase):
             decompose_dch (bool): Optionally convert a DCH channel into eight separate
                 1-bit channels. (default: True)
             verbose (bool): Display additional information
+            as_ndarray (bool): Optionally return the waveform data as numpy.ndarray
+                objects instead of lists. (default: False)
+            dtype (numpy.dtype): The floating point data type of scaled analog
+                waveform data. (default: numpy.float64)
+            raw (bool): Optionally return analog waveforms as RawWaveform objects
+                that keep the integer codes sent by the instrument and only convert
+                them to vertical units when the data attribute is accessed.
+                (default: False)
+            pack_bits (bool): Optionally return decomposed DCH bits as PackedWaveform
+                objects that store eight samples in each byte. (default: False)
+            bit_nr (int or str): The number of bits per sample of analog waveform
+                transfers: 8 halves the transfer size at a lower resolution, 16
+                keeps the full resolution, and "auto" uses 8 bits for each source
+                whose probed samples show no loss of resolution. The probe is a
+                heuristic: it checks about 10000 samples spread evenly over the
+                record, so a sample between them that needs 16 bits loses its low
+                byte. (default: 16)
+            pipeline (bool): Optionally post process each source in a worker thread
+                while the next source is downloaded. (default: False)
+            pbar_desc (str): The description shown by the progress bar.
+                (default: "Downloading")
+            pbar_position (int or None): The line on which the progress bar is
+                displayed, used when several bars are displayed at once.
+                (default: None)
+            chunk_size (int or None): The number of bytes requested by each VISA
+                read. If None, it is selected from the size of the records.
+                (default: None)
+            timeout (int or None): The VISA timeout in milliseconds while the
+                waveform data is downloaded. If None, the session timeout is
+                extended by the expected transfer time of the largest record,
+                based on the link throughput measured by previous downloads.
+                (default: None)
+            sources (list or None): The names of the sources to download, such as
+                "CH1", "MATH1" or "CH3_D0". A DCH channel name such as "CH3" selects
+                all of its bits. If None, download all available sources.
+                (default: None)
+            start (int or None): The index of the first sample to download. If None,
+                start at the first sample of the record. (default: None)
+            stop (int or None): The index one past the last sample to download. If
+                None, stop at the end of the record. (default: None)
+            start_time (float or None): The time of the first sample to download, on
+                the horizontal scale of the waveforms. (default: None)
+            stop_time (float or None): The time of the last sample to download, on
+                the horizontal scale of the waveforms. (default: None)
+            lazy (bool): Optionally keep the downloaded data of each source and only
+                post process it when the source is first accessed. The pipeline
+                argument is ignored. (default: False)
         """
-        with self.resource_manager.open_resource(self.resource_name) as inst:
+        with open_session(self.resource_manager, self.resource_name) as inst:
+            inst.state_cache = get_state_cache(self.resource_name)
+            inst.transfer_tuning = TransferTuning(
+                chunk_size, timeout, get_throughput(self.resource_name)
+            )
             result = WaveformCollection()
+            session_settings = inst.chunk_size, inst.timeout
 
             # iterate through all available sources
             try:
-                for ch, ch_data, x_scale, y_scale in self._get_data(
-                    inst, self._list_sources(inst), use_pbar, decompose_dch
+                options = ProcessOptions(decompose_dch, dtype, raw, pack_bits, bit_nr)
+                pbar_kwargs = {"desc": pbar_desc, "position": pbar_position}
+                window = Window(start, stop, start_time, stop_time)
+                if window == Window(None, None, None, None):
+                    window = None
+                result.idn, available = self._identify_and_list_sources(inst)
+                for ch, wave in self._get_data(
+                    inst,
+                    self._select_sources(available, sources),
+                    use_pbar,
+                    options,
+                    pipeline,
+                    pbar_kwargs,
+                    window,
+                    lazy,
                 ):
                     if verbose:
                         print(ch)
-                    result.data[ch] = Waveform(ch_data, x_scale, y_scale)
-            except pyvisa.errors.VisaIOError:
-                get_event_queue(inst)
+                    if lazy:
+                        result.add_lazy(ch, partial(self._decode, wave, as_ndarray))
+                    else:
+                        result.data[ch] = self._convert(wave, as_ndarray)
+            except pyvisa.errors.VisaIOError as error:
+                # Keep the events with the exception so callers can report them
+                error.events = get_event_queue(inst)
+                invalidate_state_cache(self.resource_name)
                 raise
+            finally:
+                # A persistent session must get its original settings back
+                inst.chunk_size, inst.timeout = session_settings
+            # Only the curve queries are timed, so that the link throughput does not
+            # include the metadata queries and the post processing
+            result.transfer_stats = TransferStats(
+                getattr(inst, "bytes_transferred", 0),
+                getattr(inst, "transfer_seconds", 0.0),
+            )
+            update_throughput(self.resource_name, result.transfer_stats)
         return result
 
+    @staticmethod
+    def _convert(wave, as_ndarray):
+        """Converts the data of a Waveform into a list, unless as_ndarray is True"""
+        if isinstance(wave, Waveform) and not as_ndarray:
+            wave = wave._replace(data=wave.data.tolist())
+        return wave
+
+    @classmethod
+    def _decode(cls, decoder, as_ndarray):
+        """Returns the (name, waveform) tuples of a lazily post processed block"""
+        return [(ch, cls._convert(wave, as_ndarray)) for ch, wave in decoder()]
+
+    @staticmethod
+    def _parse_identity(idn):
+        """Returns the Identity parsed from the response to an *IDN? query"""
+        return Identity(*[i.strip() for i in idn.split(",", 3)])
+
     @staticmethod
     def _classify_waveform(source):
         if source[0:4] == "MATH":
@@ -56,65 +208,104 @@ class TekSeriesCurveFeat(base.FeatureBase):
         return wave_type
 
     @staticmethod
-    def _has_data_available(instr, source):
-        """Checks that the source seems to have actual data available for download.
+    def _displayed_channels(instr, channels):
+        """Returns the channels that seem to have actual data available for download.
         This function should be called before performing a curve query."""
-        # Use "display:global:CH{x}:state?" to determine if the channel is displayed
-        # and available for download
-        if source == "NONE":
-            display_on = False
-        else:
-            display_on = bool(
-                int(instr.query("display:global:{}:state?".format(source)))
-            )
-        return display_on
+        # Use "display:global:CH{x}:state?" to determine if each channel is displayed
+        # and available for download. All channels are checked in one round trip.
+        channels = [i for i in channels if i != "NONE"]
+        if not channels:
+            return []
+        states = query_many(
+            instr,
+            ["display:global:{}:state?".format(i) for i in channels],
+            StateCache.CONFIGURATION,
+        )
+        return [i for i, state in zip(channels, states) if bool(int(state))]
 
     @staticmethod
-    def _get_xscale(instr):
+    def _parse_xscale(xincr, pt_off, xzero, xunit):
+        """Calculate the horizontal scale from the waveform output preamble"""
+        slope = float(xincr)
+        offset = float(pt_off) * -slope + float(xzero)
+        unit = xunit.strip('"')
+        return XScale(slope, offset, unit)
+
+    @staticmethod
+    def _parse_yscale(scale, position):
+        """Calculate the vertical scale from the channel scale and position"""
+        scale = float(scale)
+        position = float(position)
+        top = scale * (5 - position)
+        bottom = scale * (-5 - position)
+        return YScale(top=top, bottom=bottom)
+
+    def _get_xscale(self, instr):
         """Get the horizontal scale of the instrument"""
+        x_scale, _ = self._get_scales(instr, None, None)
+        return x_scale
+
+    def _get_scales(self, instr, wave_type, source):
+        """Get the horizontal scale and the vertical information needed to post
+        process the source data in a single round trip"""
+        queries = [
+            "WFMOutpre:XINCR?",
+            "WFMOutpre:PT_OFF?",
+            "WFMOutpre:XZERO?",
+            "WFMOutpre:XUNIT?",
+        ]
+        if wave_type is WaveType.ANALOG:
+            queries += [
+                "{}:SCALE?".format(source),
+                "{}:POSITION?".format(source),
+                "WFMOutpre:YMUlt?",
+                "WFMOutpre:YZEro?",
+            ]
 
         # This function will generate a VISA timeout if there is no waveform data
         # available and the channel is enabled.
         try:
-            xincr = instr.query("WFMOutpre:XINCR?").strip()
+            responses = query_many(instr, queries)
         except pyvisa.errors.VisaIOError:
 
             # Flush out the VISA interface event queue
             get_event_queue(instr, verbose=False)
-            result = None
-        else:
-
-            # collect more horizontal data
-            pt_off = instr.query("WFMOutpre:PT_OFF?").strip()
-            xzero = instr.query("WFMOutpre:XZERO?").strip()
-            xunit = instr.query("WFMOutpre:XUNIT?").strip()
+            return None, None
 
-            # calculate horizontal scale
-            slope = float(xincr)
-            offset = float(pt_off) * -slope + float(xzero)
-            unit = xunit.strip('"')
-            result = XScale(slope, offset, unit)
-        return result
-
-    @staticmethod
-    def _get_yscale(instr, source):
-        scale = float(instr.query("{}:SCALE?".format(source)))
-        position = float(instr.query("{}:POSITION?".format(source)))
-        top = scale * (5 - position)
-        bottom = scale * (-5 - position)
-        return YScale(top=top, bottom=bottom)
+        x_scale = self._parse_xscale(*responses[0:4])
+        if wave_type is WaveType.ANALOG:
+            y_scale = self._parse_yscale(*responses[4:6])
+            y_coeff = float(responses[6]), float(responses[7])
+            return x_scale, (y_scale, y_coeff)
+        return x_scale, None
 
     def _list_sources(self, instr):
         """Returns a list of channel name strings that we could query"""
-        available_waveforms = instr.query("data:source:available?").strip().split(",")
+        available = query_many(
+            instr, ["data:source:available?"], StateCache.ACQUISITION
+        )[0]
+        return self._useful_sources(instr, available)
+
+    def _identify_and_list_sources(self, instr):
+        """Returns the Identity of the instrument and the list returned by
+        _list_sources(), queried in the same round trip"""
+        idn, available = query_many(
+            instr, ["*IDN?", "data:source:available?"], StateCache.ACQUISITION
+        )
+        return self._parse_identity(idn), self._useful_sources(instr, available)
+
+    def _useful_sources(self, instr, available):
+        """Returns the sources of the response to a data:source:available? query
+        that have data available for download"""
+        available_waveforms = available.split(",")
 
         # Condense digital channel bits into a single channel
-        available_channels = set([i.split("_")[0] for i in available_waveforms])
+        available_channels = list(
+            dict.fromkeys(i.split("_")[0] for i in available_waveforms)
+        )
 
         # Only include channels that available for download
-        useful_channels = [
-            i for i in available_channels if self._has_data_available(instr, i)
-        ]
+        useful_channels = self._displayed_channels(instr, available_channels)
 
         # Return only waveforms that are available and have a corresponding useful
         # channel
@@ -123,38 +314,100 @@ class TekSeriesCurveFeat(base.FeatureBase):
         ]
         return useful_waveforms
 
-    def _make_jobs(self, instr, sources):
-        """Scan the instrument for available sources of data construct a list of jobs"""
+    @staticmethod
+    def _select_sources(available, selected):
+        """Returns the available sources that are selected by name, or all of them if
+        selected is None"""
+        if selected is None:
+            return available
+        selected = set(selected)
+        results = [i for i in available if i in selected or i.split("_")[0] in selected]
+        missing = selected - set(results) - set(i.split("_")[0] for i in results)
+        if missing:
+            raise ValueError(
+                "Sources not available: {}".format(", ".join(sorted(missing)))
+            )
+        return results
+
+    def _make_jobs(self, instr, sources, bit_nr=16):
+        """Scan the instrument for available sources of data construct a list of jobs.
+        The bit_nr argument selects the transfer width of analog sources: 8, 16 or
+        "auto" to probe each source for the narrowest lossless width."""
+
+        if bit_nr not in (8, 16, "auto"):
+            raise ValueError("bit_nr must be 8, 16 or 'auto', not {!r}".format(bit_nr))
 
         encoding_table = {
             WaveType.MATH: ("FPBinary", 16, "f"),
             WaveType.DIGITAL: ("RIBinary", 16, "h"),
             WaveType.ANALOG: ("RIBinary", 16, "h"),
         }
+        analog_datatypes = {8: "b", 16: "h"}
         channel_table = {
             WaveType.MATH: lambda x: x,
             WaveType.DIGITAL: lambda x: "_".join([x.split("_")[0], "DALL"]),
             WaveType.ANALOG: lambda x: x,
         }
 
+        # All sources share the record length, so it is only queried once
         results = {}
+        rec_len = None
         for source in sources:
             if source.split("_")[0] not in results:
                 # Determine the type of waveform and set key interface parameters
                 wave_type = self._classify_waveform(source)
                 channel = channel_table[wave_type](source)
-                encoding, bit_nr, datatype = encoding_table[wave_type]
+                encoding, width, datatype = encoding_table[wave_type]
 
                 # Set the start and stop point of the record
-                rec_len = int(instr.query("horizontal:recordlength?").strip())
+                if rec_len is None:
+                    rec_len = self._record_length(instr)
+
+                # Analog sources can be transferred with fewer bits per sample
+                if wave_type is WaveType.ANALOG:
+                    width = bit_nr
+                    if width == "auto":
+                        width = self._probe_bit_nr(instr, channel, rec_len)
+                    datatype = analog_datatypes[width]
 
                 # Keep track of each super channel and math source that has been handled
                 results[source.split("_")[0]] = JobParameters(
-                    wave_type, channel, encoding, bit_nr, datatype, rec_len
+                    wave_type, channel, encoding, width, datatype, rec_len
                 )
 
         return results
 
+    @staticmethod
+    def _record_length(instr):
+        """Returns the record length, which all sources share"""
+        return int(
+            query_many(instr, ["horizontal:recordlength?"], StateCache.CONFIGURATION)[0]
+        )
+
+    @staticmethod
+    def _probe_bit_nr(instr, channel, rec_len):
+        """Returns 8 if about PROBE_LENGTH samples, spread evenly over the record of
+        an analog source, can be transferred with 8 bits without losing resolution,
+        otherwise 16. This is a heuristic, since the other samples are not checked."""
+        write_many(
+            instr,
+            [
+                "data:source {}".format(channel),
+                "data:encdg RIBinary",
+                "WFMOUTPRE:BIT_NR 16",
+                "data:start 1",
+                "data:stop {}".format(rec_len),
+                "data:resample {}".format(-(-rec_len // PROBE_LENGTH)),
+            ],
+        )
+        try:
+            codes = instr.query_binary_values(
+                "curv?", datatype="h", is_big_endian=True, container=np.ndarray
+            )
+        finally:
+            write_many(instr, ["data:resample 1"])
+        return 8 if fits_in_8_bits(codes) else 16
+
     @staticmethod
     def _setup_curve_query(instr, source, parameters: dict[str, JobParameters]):
         """Setup the instrument for the curve query operation"""
@@ -162,147 +415,408 @@ class TekSeriesCurveFeat(base.FeatureBase):
         # extract the job parameters
         wave_type, channel, encoding, bit_nr, datatype, rec_len = parameters[source]
 
-        # Switch to the source and setup the data encoding
-        instr.write("data:source {}".format(channel))
-        instr.write("data:encdg {}".format(encoding))
-        instr.write("WFMOUTPRE:BIT_NR {}".format(bit_nr))
-
-        # Set the start and stop point of the record
-        rec_len = instr.query("horizontal:recordlength?").strip()
-        instr.write("data:start 1")
-        instr.write("data:stop {}".format(rec_len))
+        # Switch to the source, setup the data encoding, and set the start and stop
+        # point of the record in a single write
+        write_many(
+            instr,
+            [
+                "data:source {}".format(channel),
+                "data:encdg {}".format(encoding),
+                "WFMOUTPRE:BIT_NR {}".format(bit_nr),
+                "data:start 1",
+                "data:stop {}".format(rec_len),
+            ],
+        )
 
-    def _post_process_analog(self, instr, source, source_data, x_scale):
+    @staticmethod
+    def _post_process_analog(source, source_data, x_scale, y_scale, y_coeff, options):
         """Post processes analog channel data"""
 
         # Normal analog channels must have the vertical scale and offset applied
-        offset = float(instr.query("WFMOutpre:YZEro?"))
-        scale = float(instr.query("WFMOutpre:YMUlt?"))
-        source_data = [scale * i + offset for i in source_data]
+        scale, offset = y_coeff
 
-        # Include y-scale information with analog channel waveforms
-        y_scale = self._get_yscale(instr, source)
+        # Raw waveforms keep the codes in native byte order and apply the vertical
+        # scale on demand
+        if options.raw:
+            source_data = source_data.astype(
+                source_data.dtype.newbyteorder("="), copy=False
+            )
+            return source, RawWaveform(source_data, x_scale, y_scale, scale, offset)
 
-        return source, source_data, x_scale, y_scale
+        source_data = scale_analog(source_data, scale, offset, dtype=options.dtype)
+        return source, Waveform(source_data, x_scale, y_scale)
 
     @staticmethod
-    def _post_process_digital_bits(sources, source, source_data, x_scale, bit):
+    def _post_process_digital_bits(sources, source, source_data, x_scale, pack_bits):
         """Post processes digital channel data as separate bits"""
 
-        bit_channel = "{}_D{}".format(source.split("_")[0], bit)
-
-        # if the bit channel is available, decompose the data
-        if bit_channel in sources:
-            bit_data = [(i >> (2 * bit)) & 1 for i in source_data]
-            return bit_channel, bit_data, x_scale, None
+        # only decompose the bit channels that are available
+        bit_channels = {
+            bit: "{}_D{}".format(source.split("_")[0], bit) for bit in range(8)
+        }
+        bits = [bit for bit in bit_channels if bit_channels[bit] in sources]
+
+        results = []
+        for bit, bit_data in digital_bits(source_data, bits, pack_bits).items():
+            if pack_bits:
+                wave = PackedWaveform(bit_data, len(source_data), x_scale, None)
+            else:
+                wave = Waveform(bit_data, x_scale, None)
+            results.append((bit_channels[bit], wave))
+        return results
 
     @staticmethod
     def _post_process_digital_byte(source, source_data, x_scale):
         """Post processes digital channel data as a byte"""
-        digital = []
-        for i in source_data:
-            a = (
-                (i & 0x4000) >> 7
-                | (i & 0x1000) >> 6
-                | (i & 0x400) >> 5
-                | (i & 0x100) >> 4
-                | (i & 0x40) >> 3
-                | (i & 0x10) >> 2
-                | (i & 0x4) >> 1
-                | i & 0x1
-            )
-            digital.append(a)
-        return source.split("_")[0], digital, x_scale, None
+        digital = digital_byte(source_data)
+        return source.split("_")[0], Waveform(digital, x_scale, None)
 
-    def _get_data(self, instr, sources, use_pbar, decompose_dch):
-        """Returns an iterator that yields the source data from the oscilloscope"""
+    @staticmethod
+    def _output_names(wave_type, sources, source, options):
+        """Returns the names of the waveforms that _post_process() creates from the
+        source data"""
+        if wave_type is WaveType.DIGITAL:
+            channel = source.split("_")[0]
+            if not options.decompose_dch:
+                return [channel]
+            bit_channels = ["{}_D{}".format(channel, bit) for bit in range(8)]
+            return [i for i in bit_channels if i in sources]
+        return [source]
+
+    def _post_process(
+        self, wave_type, sources, source, source_data, x_scale, y_info, options
+    ):
+        """Returns a list of (source, waveform) tuples created from the big-endian
+        source data. The byte order is converted here, rather than when the data is
+        read, so that a pipelined download can do it in the worker thread."""
+
+        if wave_type is WaveType.DIGITAL:
+
+            # Digital channel to be decomposed into separate bits
+            if options.decompose_dch:
+                return self._post_process_digital_bits(
+                    sources, source, source_data, x_scale, options.pack_bits
+                )
 
-        jobs = self._make_jobs(instr, sources)
-        pbar_disabled = not use_pbar
+            # Digital channel to be converted into an 8-bit word
+            else:
+                return [self._post_process_digital_byte(source, source_data, x_scale)]
 
-        # remember the state of the acquisition system and then stop acquiring waveforms
+        elif wave_type is WaveType.ANALOG:
+            y_scale, y_coeff = y_info
+            return [
+                self._post_process_analog(
+                    source, source_data, x_scale, y_scale, y_coeff, options
+                )
+            ]
+
+        elif wave_type is WaveType.MATH:
+            # Y-scale information for MATH channels is not supported at this time
+            source_data = source_data.astype(np.float32, copy=False)
+            return [(source, Waveform(source_data, x_scale, None))]
+
+        else:
+            raise Exception("It should have been impossible to execute this code")
+
+    @staticmethod
+    def _stop_acquisition(instr):
+        """Stops the acquisition system, if it is running, and returns its state"""
         acq_state = instr.query("ACQuire:STATE?").strip()
-        instr.write("ACQuire:STATE STOP")
+        if acq_state != "0":
+            instr.write("ACQuire:STATE STOP")
+        return acq_state
 
-        # Calculate the total number of bytes of data to be downloaded from the
-        # instrument
-        bytes_per_sample = {"FPBinary": 4, "RIBinary": 2}
-        total_bytes = reduce(
+    @staticmethod
+    def _restore_acquisition(instr, acq_state):
+        """Restores the acquisition state returned by _stop_acquisition()"""
+        if acq_state != "0":
+            instr.write("ACQuire:STATE {}".format(acq_state))
+
+    @staticmethod
+    def _total_bytes(jobs):
+        """Calculate the total number of bytes of data to be downloaded from the
+        instrument"""
+        return reduce(
             lambda a, b: a + b,
-            [bytes_per_sample[jobs[i].encoding] * jobs[i].record_length for i in jobs],
+            [
+                np.dtype(jobs[i].data_type).itemsize * jobs[i].record_length
+                for i in jobs
+            ],
+            0,
         )
 
-        with tqdm(
-            desc="Downloading",
-            unit="B",
-            total=total_bytes,
-            disable=pbar_disabled,
-            unit_scale=True,
-        ) as t:
-
-            # Patch the instr object with a custom methods that implement tqdm updates
-            instr.progress_bar = t
-            instr.read_bytes_progress_bar = types.MethodType(
-                read_bytes_progress_bar, instr
-            )
-            instr._read_raw_progress_bar = types.MethodType(
-                _read_raw_progress_bar, instr
-            )
-            instr.read_binary_values_progress_bar = types.MethodType(
-                read_binary_values_progress_bar,
-                instr,
-            )
+    @staticmethod
+    def _tune_transfer(instr, jobs):
+        """Sets the VISA chunk size and timeout of the instr object for downloading
+        the jobs, if it has transfer tuning settings"""
+        tuning = getattr(instr, "transfer_tuning", None)
+        if tuning is None:
+            return
+        block_bytes = max(
+            [np.dtype(i.data_type).itemsize * i.record_length for i in jobs.values()],
+            default=0,
+        )
+        instr.chunk_size = tuning.chunk_size or auto_chunk_size(block_bytes)
+        if tuning.timeout is not None:
+            instr.timeout = tuning.timeout
+        else:
+            instr.timeout = auto_timeout(instr.timeout, block_bytes, tuning.throughput)
 
-            for source in jobs:
+    @staticmethod
+    def _patch_progress_bar(instr, pbar):
+        """Patch the instr object with a custom methods that implement tqdm updates"""
+        instr.progress_bar = pbar
+        instr.bytes_transferred = 0
+        instr.transfer_seconds = 0.0
+        instr.read_bytes_progress_bar = types.MethodType(read_bytes_progress_bar, instr)
+        instr._read_raw_progress_bar = types.MethodType(_read_raw_progress_bar, instr)
+        instr.read_binary_values_progress_bar = types.MethodType(
+            read_binary_values_progress_bar,
+            instr,
+        )
+        instr.read_ieee_block_progress_bar = types.MethodType(
+            read_ieee_block_progress_bar, instr
+        )
 
-                self._setup_curve_query(instr, source, jobs)
+    @staticmethod
+    def _read_curve(instr, datatype):
+        """Issue the curve query command and read the waveform data sent by the
+        instrument as a big-endian ndarray view of the received block. The time
+        spent is added to the transfer time of the instr object."""
+        read_start = time()
+        instr.write("curv?")
+        source_data = instr.read_ieee_block_progress_bar(
+            datatype=datatype,
+            is_big_endian=True,
+            expect_termination=True,
+        )
+        instr.bytes_transferred += source_data.nbytes
+        instr.transfer_seconds += time() - read_start
+        return source_data
 
-                # extract the job parameters
-                wave_type, channel, encoding, bit_nr, datatype, rec_len = jobs[source]
+    def _transfer_source(self, instr, source, jobs, window=None):
+        """Downloads the data of a single source and returns a (wave_type,
+        source_data, x_scale, y_info) tuple, or None if no data is available. If a
+        Window is given, only the samples inside it are downloaded."""
 
-                # Horizontal scale information
-                x_scale = self._get_xscale(instr)
-                if x_scale is not None:
+        self._setup_curve_query(instr, source, jobs)
 
-                    # Issue the curve query command
-                    instr.write("curv?")
+        # extract the job parameters
+        wave_type, channel, encoding, bit_nr, datatype, rec_len = jobs[source]
+
+        # Horizontal scale and vertical information
+        x_scale, y_info = self._get_scales(instr, wave_type, source)
+        if x_scale is None:
+            return None
+
+        # The scales describe the whole record, so the horizontal offset is moved to
+        # the first sample of the window
+        if window is not None:
+            first, stop = window_indices(window, x_scale, rec_len)
+            write_many(
+                instr,
+                ["data:start {}".format(first + 1), "data:stop {}".format(stop)],
+            )
+            x_scale = x_scale._replace(offset=x_scale.offset + first * x_scale.slope)
+
+            # The samples outside the window are not downloaded
+            skipped = np.dtype(datatype).itemsize * (rec_len - (stop - first))
+            instr.progress_bar.total -= skipped
+            instr.progress_bar.refresh()
+
+        return wave_type, self._read_curve(instr, datatype), x_scale, y_info
+
+    def _get_data(
+        self,
+        instr,
+        sources,
+        use_pbar,
+        options,
+        pipeline=False,
+        pbar_kwargs=None,
+        window=None,
+        lazy=False,
+    ):
+        """Returns an iterator that yields the source data from the oscilloscope. If
+        lazy is True, it yields a (names, decoder) tuple for each downloaded block
+        instead, where calling decoder() post processes the block."""
 
-                    # Read the waveform data sent by the instrument
-                    source_data = instr.read_binary_values_progress_bar(
-                        datatype=datatype, is_big_endian=True, expect_termination=True
-                    )
+        pbar_disabled = not use_pbar
 
-                    if wave_type is WaveType.DIGITAL:
+        # An empty sample index window is rejected before anything is changed
+        if window is not None:
+            rec_len = self._record_length(instr)
+            window_indices(
+                window._replace(start_time=None, stop_time=None), None, rec_len
+            )
 
-                        # Digital channel to be decomposed into separate bits
-                        if decompose_dch:
-                            for bit in range(8):
-                                result = self._post_process_digital_bits(
-                                    sources, source, source_data, x_scale, bit
-                                )
-                                if result:
-                                    yield result
+        # remember the state of the acquisition system and then stop acquiring
+        # waveforms, so that a probe of the transfer width sees the downloaded one
+        acq_state = self._stop_acquisition(instr)
 
-                        # Digital channel to be converted into an 8-bit word
-                        else:
-                            yield self._post_process_digital_byte(
-                                source, source_data, x_scale
-                            )
+        # When pipelined, a single worker thread post processes each source while the
+        # next one is downloaded. Sources are still yielded in order.
+        executor = ThreadPoolExecutor(max_workers=1) if pipeline else None
+        pending = deque()
 
-                    elif wave_type is WaveType.ANALOG:
-                        yield self._post_process_analog(
-                            instr, source, source_data, x_scale
+        pbar_kwargs = pbar_kwargs or {"desc": "Downloading"}
+        try:
+            jobs = self._make_jobs(instr, sources, options.bit_nr)
+            self._tune_transfer(instr, jobs)
+            with tqdm(
+                unit="B",
+                total=self._total_bytes(jobs),
+                disable=pbar_disabled,
+                unit_scale=True,
+                **pbar_kwargs,
+            ) as t:
+                self._patch_progress_bar(instr, t)
+
+                for source in jobs:
+                    transfer = self._transfer_source(instr, source, jobs, window)
+                    if transfer is not None:
+                        wave_type, source_data, x_scale, y_info = transfer
+                        args = (
+                            wave_type,
+                            sources,
+                            source,
+                            source_data,
+                            x_scale,
+                            y_info,
+                            options,
                         )
+                        if lazy:
+                            names = self._output_names(
+                                wave_type, sources, source, options
+                            )
+                            yield names, partial(self._post_process, *args)
+                            continue
+                        if executor is None:
+                            yield from self._post_process(*args)
+                            continue
+
+                        # Only one source waits for post processing at a time, which
+                        # bounds the memory held by downloaded blocks
+                        while pending:
+                            yield from pending.popleft().result()
+                        pending.append(executor.submit(self._post_process, *args))
+
+                while pending:
+                    yield from pending.popleft().result()
+
+        # Restore the acquisition state, even if an error occurs or the generator is
+        # closed early
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+            self._restore_acquisition(instr, acq_state)
+
+
+class TekSeriesCurveStreamFeat(TekSeriesCurveFeat):
+    def feature(
+        self,
+        *,
+        chunk_size=1000000,
+        use_pbar=True,
+        decompose_dch=True,
+        dtype=np.float64,
+        raw=False,
+        pack_bits=False,
+        bit_nr=16,
+    ):
+        """
+        Returns a generator object that downloads the waveform data available on the
+        instrument in chunks of at most chunk_size samples, yielding a WaveformChunk
+        for each chunk of each source. The waveform data of each chunk is a
+        numpy.ndarray, and its horizontal scale offset is the time of the first sample
+        of the chunk.
 
-                    elif wave_type is WaveType.MATH:
-                        # Y-scale information for MATH channels is not supported at
-                        # this time
-                        yield source, source_data, x_scale, None
+        Parameters:
+            chunk_size (int): The maximum number of samples in each chunk.
+                (default: 1000000)
+            use_pbar (bool): Optionally display a progress bar. (default: True)
+            decompose_dch (bool): Optionally convert a DCH channel into eight separate
+                1-bit channels. (default: True)
+            dtype (numpy.dtype): The floating point data type of scaled analog
+                waveform data. (default: numpy.float64)
+            raw (bool): Optionally return analog waveforms as RawWaveform objects.
+                (default: False)
+            pack_bits (bool): Optionally return decomposed DCH bits as PackedWaveform
+                objects. (default: False)
+            bit_nr (int or str): The number of bits per sample of analog waveform
+                transfers: 8, 16 or "auto". (default: 16)
+        """
+        options = ProcessOptions(decompose_dch, dtype, raw, pack_bits, bit_nr)
+        with open_session(self.resource_manager, self.resource_name) as inst:
+            inst.state_cache = get_state_cache(self.resource_name)
+            try:
+                yield from self._get_chunks(
+                    inst, self._list_sources(inst), use_pbar, chunk_size, options
+                )
+            except pyvisa.errors.VisaIOError as error:
+                error.events = get_event_queue(inst)
+                invalidate_state_cache(self.resource_name)
+                raise
 
-                    else:
-                        raise Exception(
-                            "It should have been impossible to execute this code"
+    def _get_chunks(self, instr, sources, use_pbar, chunk_size, options):
+        """Returns an iterator that yields the source data from the oscilloscope one
+        chunk at a time"""
+
+        # remember the state of the acquisition system and then stop acquiring
+        # waveforms, so that a probe of the transfer width sees the downloaded one
+        acq_state = self._stop_acquisition(instr)
+
+        try:
+            jobs = self._make_jobs(instr, sources, options.bit_nr)
+            with tqdm(
+                desc="Downloading",
+                unit="B",
+                total=self._total_bytes(jobs),
+                disable=not use_pbar,
+                unit_scale=True,
+            ) as t:
+                self._patch_progress_bar(instr, t)
+
+                for source in jobs:
+
+                    self._setup_curve_query(instr, source, jobs)
+
+                    # extract the job parameters
+                    wave_type, channel, encoding, bit_nr, datatype, rec_len = jobs[
+                        source
+                    ]
+
+                    # The horizontal scale of the whole record locates each chunk
+                    x_scale, y_info = self._get_scales(instr, wave_type, source)
+                    if x_scale is None:
+                        continue
+
+                    # Step the start and stop point through the record
+                    for start in range(0, rec_len, chunk_size):
+                        stop = min(start + chunk_size, rec_len)
+                        write_many(
+                            instr,
+                            [
+                                "data:start {}".format(start + 1),
+                                "data:stop {}".format(stop),
+                            ],
                         )
 
-        # Restore the acquisition state
-        instr.write("ACQuire:STATE {}".format(acq_state))
+                        chunk_x_scale = x_scale._replace(
+                            offset=x_scale.offset + start * x_scale.slope
+                        )
+                        source_data = self._read_curve(instr, datatype)
+                        for name, wave in self._post_process(
+                            wave_type,
+                            sources,
+                            source,
+                            source_data,
+                            chunk_x_scale,
+                            y_info,
+                            options,
+                        ):
+                            yield WaveformChunk(name, start, rec_len, wave)
+
+        # Restore the acquisition state, even if the generator is closed early
+        finally:
+            self._restore_acquisition(instr, acq_state)
@@ -0,0 +1,187 @@
+import numpy as np
+import pyvisa
+from tqdm import tqdm
+
+from .api_types import FrameWaveform
+from .api_types import WaveformCollection
+from .api_types import TransferStats
+from .api_types import StateCache
+from ._tek_series_mso import ProcessOptions
+from ._tek_series_mso import get_event_queue
+from ._tek_series_mso import get_state_cache
+from ._tek_series_mso import invalidate_state_cache
+from ._tek_series_mso import open_session
+from ._tek_series_mso import query_many
+from ._tek_series_mso import write_many
+from ._tek_series_mso_curve_feat import TekSeriesCurveFeat
+
+# The number of frame timestamps requested by each compound query
+TIMESTAMPS_PER_QUERY = 100
+
+
+class TekSeriesCurveFramesFeat(TekSeriesCurveFeat):
+    def feature(
+        self,
+        *,
+        start_frame=1,
+        stop_frame=None,
+        timestamps=True,
+        use_pbar=True,
+        decompose_dch=True,
+        dtype=np.float64,
+    ):
+        """
+        Returns a WaveformCollection object containing the FastFrame frames available
+        on the instrument. All the frames of a source are downloaded in a single curve
+        query, and each source is returned as a FrameWaveform object whose data is a
+        numpy.ndarray with one row per frame.
+
+        Parameters:
+            start_frame (int): The first frame to download. (default: 1)
+            stop_frame (int or None): The last frame to download. If None, download
+                up to the last acquired frame. (default: None)
+            timestamps (bool): Optionally query the trigger timestamp string of each
+                frame. (default: True)
+            use_pbar (bool): Optionally display a progress bar. (default: True)
+            decompose_dch (bool): Optionally convert a DCH channel into eight separate
+                1-bit channels. (default: True)
+            dtype (numpy.dtype): The floating point data type of scaled analog
+                waveform data. (default: numpy.float64)
+        """
+        options = ProcessOptions(decompose_dch, dtype, False, False)
+        with open_session(self.resource_manager, self.resource_name) as inst:
+            inst.state_cache = get_state_cache(self.resource_name)
+            result = WaveformCollection()
+            try:
+                state, frame_count = query_many(
+                    inst,
+                    ["HORIZONTAL:FASTFRAME:STATE?", "HORIZONTAL:FASTFRAME:COUNT?"],
+                    StateCache.CONFIGURATION,
+                )
+                if not int(state):
+                    raise ValueError("FastFrame is not enabled on the instrument")
+                if stop_frame is None:
+                    stop_frame = int(frame_count)
+                if not 1 <= start_frame <= stop_frame <= int(frame_count):
+                    raise ValueError(
+                        "Invalid frame range {}-{}".format(start_frame, stop_frame)
+                    )
+                for ch, wave in self._get_frames(
+                    inst,
+                    self._list_sources(inst),
+                    use_pbar,
+                    start_frame,
+                    stop_frame,
+                    timestamps,
+                    options,
+                ):
+                    result.data[ch] = wave
+            except pyvisa.errors.VisaIOError as error:
+                # Keep the events with the exception so callers can report them
+                error.events = get_event_queue(inst)
+                invalidate_state_cache(self.resource_name)
+                raise
+            # Only the curve queries are timed, like the curve feature
+            result.transfer_stats = TransferStats(
+                getattr(inst, "bytes_transferred", 0),
+                getattr(inst, "transfer_seconds", 0.0),
+            )
+        return result
+
+    @staticmethod
+    def _get_timestamps(instr, channel, start_frame, stop_frame):
+        """Returns a list of the trigger timestamp strings of the frames, querying
+        TIMESTAMPS_PER_QUERY frames in each round trip"""
+        results = []
+        for first in range(start_frame, stop_frame + 1, TIMESTAMPS_PER_QUERY):
+            last = min(first + TIMESTAMPS_PER_QUERY - 1, stop_frame)
+            results += [
+                i.strip('"')
+                for i in query_many(
+                    instr,
+                    [
+                        "HORIZONTAL:FASTFRAME:TIMESTAMP:FRAME? {},{}".format(channel, i)
+                        for i in range(first, last + 1)
+                    ],
+                )
+            ]
+        return results
+
+    def _get_frames(
+        self, instr, sources, use_pbar, start_frame, stop_frame, timestamps, options
+    ):
+        """Returns an iterator that yields the frames of each source as a
+        FrameWaveform object"""
+
+        frames = stop_frame - start_frame + 1
+
+        # remember the state of the acquisition system and then stop acquiring waveforms
+        acq_state = self._stop_acquisition(instr)
+
+        frame_range = None
+        try:
+            jobs = self._make_jobs(instr, sources)
+
+            # Every source shares the trigger of each frame, so the timestamps are the
+            # same
+            frame_times = None
+            if timestamps and jobs:
+                channel = next(iter(jobs.values())).channel_name
+                frame_times = self._get_timestamps(
+                    instr, channel, start_frame, stop_frame
+                )
+
+            # Each curve query returns the selected frames one after another. The
+            # frame range is restored afterwards so it does not affect later curve
+            # queries.
+            frame_range = query_many(instr, ["data:framestart?", "data:framestop?"])
+            write_many(
+                instr,
+                [
+                    "data:framestart {}".format(start_frame),
+                    "data:framestop {}".format(stop_frame),
+                ],
+            )
+
+            with tqdm(
+                desc="Downloading",
+                unit="B",
+                total=self._total_bytes(jobs) * frames,
+                disable=not use_pbar,
+                unit_scale=True,
+            ) as t:
+                self._patch_progress_bar(instr, t)
+
+                for source in jobs:
+                    transfer = self._transfer_source(instr, source, jobs)
+                    if transfer is None:
+                        continue
+                    wave_type, source_data, x_scale, y_info = transfer
+                    for name, wave in self._post_process(
+                        wave_type,
+                        sources,
+                        source,
+                        source_data,
+                        x_scale,
+                        y_info,
+                        options,
+                    ):
+                        yield name, FrameWaveform(
+                            wave.data.reshape(frames, -1),
+                            wave.x_scale,
+                            wave.y_scale,
+                            frame_times,
+                        )
+
+        # Restore the frame range and the acquisition state, even if an error occurs
+        # or the generator is closed early
+        finally:
+            if frame_range is not None:
+                write_many(
+                    instr,
+                    [
+                        "data:framestart {}".format(frame_range[0]),
+                        "data:framestop {}".format(frame_range[1]),
+                    ],
+                )
+            self._restore_acquisition(instr, acq_state)
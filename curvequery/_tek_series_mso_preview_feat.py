@@ -0,0 +1,160 @@
+from time import time
+
+import numpy as np
+import pyvisa
+from tqdm import tqdm
+
+from .api_types import Waveform
+from .api_types import WaveformCollection
+from .api_types import TransferStats
+from .api_types import StateCache
+from ._tek_series_mso import ProcessOptions
+from ._tek_series_mso import get_event_queue
+from ._tek_series_mso import get_state_cache
+from ._tek_series_mso import invalidate_state_cache
+from ._tek_series_mso import open_session
+from ._tek_series_mso import query_many
+from ._tek_series_mso import write_many
+from ._post_process import min_max_envelope
+from ._tek_series_mso_curve_feat import TekSeriesCurveStreamFeat
+
+# The approximate number of samples downloaded in each chunk of an envelope preview
+ENVELOPE_CHUNK_SIZE = 1000000
+
+
+class TekSeriesPreviewFeat(TekSeriesCurveStreamFeat):
+    def feature(
+        self,
+        *,
+        points=1000,
+        method="envelope",
+        use_pbar=False,
+        decompose_dch=True,
+        dtype=np.float64,
+    ):
+        """
+        Returns a WaveformCollection object containing a reduced version of each
+        waveform available on the instrument, for displaying previews. The slope of
+        the horizontal scale of each waveform is the time between its points.
+
+        Parameters:
+            points (int): The approximate number of points of each waveform.
+                (default: 1000)
+            method (str): "envelope" downloads the full record in chunks and returns
+                an array with the minimum and maximum of each bin of samples, with
+                one row per point. "decimate" has the instrument send every Nth
+                sample (DATA:RESAMPLE), so only the points cross the wire, but
+                narrow peaks between them are missed. (default: "envelope")
+            use_pbar (bool): Optionally display a progress bar. (default: False)
+            decompose_dch (bool): Optionally convert a DCH channel into eight separate
+                1-bit channels. (default: True)
+            dtype (numpy.dtype): The floating point data type of scaled analog
+                waveform data. (default: numpy.float64)
+        """
+        if method not in ("envelope", "decimate"):
+            raise ValueError(
+                "method must be 'envelope' or 'decimate', not {!r}".format(method)
+            )
+        options = ProcessOptions(decompose_dch, dtype, False, False)
+        with open_session(self.resource_manager, self.resource_name) as inst:
+            inst.state_cache = get_state_cache(self.resource_name)
+            result = WaveformCollection()
+            start_time = time()
+            try:
+                sources = self._list_sources(inst)
+                if method == "envelope":
+                    waves = self._get_envelopes(
+                        inst, sources, use_pbar, points, options
+                    )
+                else:
+                    waves = self._get_decimated(
+                        inst, sources, use_pbar, points, options
+                    )
+                for ch, wave in waves:
+                    result.data[ch] = wave
+            except pyvisa.errors.VisaIOError as error:
+                # Keep the events with the exception so callers can report them
+                error.events = get_event_queue(inst)
+                invalidate_state_cache(self.resource_name)
+                raise
+            result.transfer_stats = TransferStats(
+                getattr(inst, "bytes_transferred", 0), time() - start_time
+            )
+        return result
+
+    def _get_envelopes(self, instr, sources, use_pbar, points, options):
+        """Returns an iterator that yields the min/max envelope of each source"""
+
+        # Every chunk holds a whole number of bins, so no bin spans two chunks
+        rec_len = int(
+            query_many(instr, ["horizontal:recordlength?"], StateCache.CONFIGURATION)[0]
+        )
+        bin_size = -(-rec_len // points)
+        chunk_size = bin_size * max(1, ENVELOPE_CHUNK_SIZE // bin_size)
+
+        envelopes = {}
+        for chunk in self._get_chunks(instr, sources, use_pbar, chunk_size, options):
+            wave = chunk.waveform
+            envelope = min_max_envelope(wave.data, bin_size)
+            if chunk.start == 0:
+                x_scale = wave.x_scale._replace(slope=wave.x_scale.slope * bin_size)
+                envelopes[chunk.source] = [envelope], x_scale, wave.y_scale
+            else:
+                envelopes[chunk.source][0].append(envelope)
+        for source, (parts, x_scale, y_scale) in envelopes.items():
+            yield source, Waveform(np.concatenate(parts), x_scale, y_scale)
+
+    def _get_decimated(self, instr, sources, use_pbar, points, options):
+        """Returns an iterator that yields every Nth sample of each source"""
+
+        jobs = self._make_jobs(instr, sources)
+        if not jobs:
+            return
+        step = -(-next(iter(jobs.values())).record_length // points)
+
+        # remember the state of the acquisition system and then stop acquiring waveforms
+        acq_state = self._stop_acquisition(instr)
+
+        try:
+            with tqdm(
+                desc="Downloading",
+                unit="B",
+                total=-(-self._total_bytes(jobs) // step),
+                disable=not use_pbar,
+                unit_scale=True,
+            ) as t:
+                self._patch_progress_bar(instr, t)
+
+                for source in jobs:
+
+                    self._setup_curve_query(instr, source, jobs)
+                    wave_type, channel, encoding, bit_nr, datatype, rec_len = jobs[
+                        source
+                    ]
+
+                    # The scales are read at full resolution, so the slope of the
+                    # horizontal scale is multiplied by the step
+                    x_scale, y_info = self._get_scales(instr, wave_type, source)
+                    if x_scale is None:
+                        continue
+                    x_scale = x_scale._replace(slope=x_scale.slope * step)
+
+                    write_many(instr, ["data:resample {}".format(step)])
+                    try:
+                        source_data = self._read_curve(instr, datatype)
+                    finally:
+                        write_many(instr, ["data:resample 1"])
+
+                    yield from self._post_process(
+                        wave_type,
+                        sources,
+                        source,
+                        source_data,
+                        x_scale,
+                        y_info,
+                        options,
+                    )
+
+        # Restore the acquisition state, even if the generator is closed early
+        finally:
+            self._restore_acquisition(instr, acq_state)
@@ -0,0 +1,19 @@
+from visadore import base
+
+from ._tek_series_mso import persistent_session
+
+
+class TekSeriesSessionFeat(base.FeatureBase):
+    def feature(self):
+        """
+        Returns a context manager that keeps a single VISA session with the instrument
+        open while it is active. The curve, curve_stream, acquire, setup and
+        default_setup features reuse that session instead of opening and closing a
+        new one on each call, which saves a connection handshake per call.
+
+        Usage:
+            with oscope.session():
+                for i in oscope.acquire(count=100):
+                    wave_collection = oscope.curve()
+        """
+        return persistent_session(self.resource_manager, self.resource_name)
@@ -2,12 +2,15 @@ from visadore import base
 import pyvisa
 
 from ._tek_series_mso import get_event_queue
+from ._tek_series_mso import invalidate_state_cache
+from ._tek_series_mso import open_session
 
 
 class TekSeriesDefaultFeat(base.FeatureBase):
     def feature(self):
         """Performs a default setup and waits for the operation to finish"""
-        with self.resource_manager.open_resource(self.resource_name) as inst:
+        invalidate_state_cache(self.resource_name)
+        with open_session(self.resource_manager, self.resource_name) as inst:
             try:
                 inst.write("*RST")
                 inst.query("*OPC?")
@@ -21,10 +24,16 @@ class TekSeriesSetupFeat(base.FeatureBase):
         """
         Sets or gets the setup configuration from the instrument as a string.
         """
-        with self.resource_manager.open_resource(self.resource_name) as inst:
+        with open_session(self.resource_manager, self.resource_name) as inst:
+            # A persistent session must get its original timeout back
+            timeout = inst.timeout
             inst.timeout = 20000  # this can take a while, so use a 20 second timeout
-            if settings:
-                inst.write("{:s}".format(settings))
-                inst.query("*OPC?")
-            else:
-                return inst.query("SET?")
+            try:
+                if settings:
+                    invalidate_state_cache(self.resource_name)
+                    inst.write("{:s}".format(settings))
+                    inst.query("*OPC?")
+                else:
+                    return inst.query("SET?")
+            finally:
+                inst.timeout = timeout
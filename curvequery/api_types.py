@@ -1,10 +1,53 @@
+import json
+import os
 from collections import namedtuple
+from collections.abc import Mapping
+
+import numpy as np
+
+from ._post_process import scale_analog
 
 Identity = namedtuple("Identity", "company, model, serial, config")
 XScale = namedtuple("XScale", "slope, offset, unit")
 YScale = namedtuple("YScale", "top, bottom")
 FeatureTable = namedtuple("FeatureTable", "name, entries")
 Waveform = namedtuple("Waveform", "data, x_scale, y_scale")
+WaveformChunk = namedtuple("WaveformChunk", "source, start, record_length, waveform")
+FrameWaveform = namedtuple("FrameWaveform", "data, x_scale, y_scale, timestamps")
+
+
+class RawWaveform(
+    namedtuple("RawWaveform", "raw_data, x_scale, y_scale, y_mult, y_zero")
+):
+    """An analog waveform that keeps the unscaled codes sent by the instrument along
+    with the vertical coefficients needed to convert them into vertical units."""
+
+    __slots__ = ()
+
+    @property
+    def data(self):
+        """The waveform data in vertical units, calculated on each access"""
+        return self.scaled()
+
+    def scaled(self, dtype=np.float64):
+        """Returns the waveform data in vertical units as an array of the given
+        floating point data type"""
+        return scale_analog(self.raw_data, self.y_mult, self.y_zero, dtype=dtype)
+
+
+class PackedWaveform(
+    namedtuple("PackedWaveform", "packed_data, length, x_scale, y_scale")
+):
+    """A 1-bit digital waveform stored with eight samples in each byte (little bit
+    order), which uses an eighth of the memory of one byte per sample."""
+
+    __slots__ = ()
+
+    @property
+    def data(self):
+        """The waveform data unpacked into one uint8 per sample, calculated on each
+        access"""
+        return np.unpackbits(self.packed_data, count=self.length, bitorder="little")
 
 
 class VisaResourceError(Exception):
@@ -21,24 +64,204 @@ class CompatibilityError(VisaResourceError):
 
 
 class CurveQueryError(VisaResourceError):
-    pass
+    def __init__(self, msg, *, inst=None, events=None):
+        super().__init__(msg, inst=inst)
+        self.events = events if events is not None else []
 
 
 class SequenceTimeout(Exception):
     """Raised when an acquisition does not finish in the specified time out period"""
 
 
+class TransferStats(namedtuple("TransferStats", "bytes, seconds")):
+    """The number of bytes downloaded and the time it took"""
+
+    __slots__ = ()
+
+    @property
+    def rate(self):
+        """The average transfer rate in bytes per second"""
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+
+class StateCache:
+    """Remembers the settings written to an instrument and the metadata read from it,
+    so that commands which would not change anything can be skipped.
+
+    Configuration metadata only changes when the instrument is set up. Acquisition
+    metadata can also change when the instrument acquires a new waveform.
+    """
+
+    CONFIGURATION = "configuration"
+    ACQUISITION = "acquisition"
+
+    # Settings that the instrument changes when another setting is written. For
+    # example, the transfer width follows the encoding of the selected source.
+    COUPLED_SETTINGS = {
+        "data:source": ["wfmoutpre:bit_nr"],
+        "data:encdg": ["wfmoutpre:bit_nr"],
+    }
+
+    def __init__(self):
+        self.settings = {}
+        self.metadata = {self.CONFIGURATION: {}, self.ACQUISITION: {}}
+
+    def invalidate(self, scope=None):
+        """Forgets the cached metadata of the given scope. If scope is None, forgets
+        all cached settings and metadata."""
+        if scope is None:
+            self.settings.clear()
+            for entries in self.metadata.values():
+                entries.clear()
+        else:
+            self.metadata[scope].clear()
+
+    def filter_writes(self, commands):
+        """Returns the commands that would change a cached setting, and caches the
+        settings they write. Writing a setting forgets the settings coupled to it,
+        so they are written again."""
+        results = []
+        for command in commands:
+            header, _, value = command.strip().lstrip(":").partition(" ")
+            header = header.lower()
+            if self.settings.get(header) != value:
+                self.settings[header] = value
+                results.append(command)
+                for coupled in self.COUPLED_SETTINGS.get(header, []):
+                    self.settings.pop(coupled, None)
+        return results
+
+
+# The waveform types that can be saved, and the field that holds the array of each
+_WAVEFORM_TYPES = {
+    i.__name__: (i, field)
+    for i, field in [
+        (Waveform, "data"),
+        (RawWaveform, "raw_data"),
+        (PackedWaveform, "packed_data"),
+        (FrameWaveform, "data"),
+    ]
+}
+
+
 class WaveformCollection:
+    """The waveforms downloaded from an instrument, accessed by source name.
+
+    The data attribute maps each source onto its waveform. Lazily decoded sources are
+    only added to data once they are decoded, so use the sources property, indexing
+    or items() to reach every source."""
+
+    METADATA_FILE = "metadata.json"
+
     def __init__(self):
         self.idn = None
         self.data = {}
+        self.transfer_stats = None
+        self._decoders = {}
 
     @property
     def sources(self):
-        return list(self.data.keys())
+        return list(dict.fromkeys([*self._decoders, *self.data]))
 
     def __getitem__(self, item):
+        if item not in self.data and item in self._decoders:
+            for source, wave in self._decoders[item]():
+                self.data[source] = wave
         return self.data[item]
 
     def __len__(self):
-        return len(self.data.keys())
+        return len(self.sources)
+
+    def items(self):
+        """Returns an iterator of (source, waveform) tuples, decoding lazily decoded
+        sources as they are reached"""
+        return ((source, self[source]) for source in self.sources)
+
+    def add_lazy(self, sources, decoder):
+        """Adds sources that are decoded when one of them is first accessed. Calling
+        decoder() must return a list of (source, waveform) tuples for the sources."""
+        for source in sources:
+            self._decoders[source] = decoder
+            self.data.pop(source, None)
+
+    def release(self, source=None):
+        """Frees the decoded waveform of a lazily decoded source, or of all of them if
+        source is None. The source is decoded again on its next access."""
+        for i in self._decoders if source is None else [source]:
+            if i in self._decoders:
+                self.data.pop(i, None)
+
+    def save(self, directory):
+        """Saves the waveforms into a directory, with a NPY file containing the array
+        of each source and a JSON file containing the scales and the identity of the
+        instrument. Raw and packed waveforms are saved as they are, without being
+        converted into vertical units or unpacked first.
+
+        Lazily decoded sources are decoded before they are saved, and raw codes are
+        saved in native byte order rather than as the big-endian block sent by the
+        instrument, so that every file loads without knowing the transfer format."""
+        os.makedirs(directory, exist_ok=True)
+        for source, wave in self.items():
+            field = _WAVEFORM_TYPES[type(wave).__name__][1]
+            np.save(
+                os.path.join(directory, source + ".npy"),
+                np.asarray(getattr(wave, field)),
+            )
+        self.save_metadata(directory)
+
+    def save_metadata(self, directory):
+        """Writes the JSON file of the save() method, containing the scales of each
+        waveform and the identity of the instrument, into a directory that already
+        holds the NPY file of each source"""
+        metadata = {
+            "idn": list(self.idn) if self.idn else None,
+            "waveforms": {},
+        }
+        for source, wave in self.items():
+            wave_type = type(wave).__name__
+            fields = wave._asdict()
+            del fields[_WAVEFORM_TYPES[wave_type][1]]
+            metadata["waveforms"][source] = {"type": wave_type, "fields": fields}
+        with open(os.path.join(directory, self.METADATA_FILE), "w") as f:
+            json.dump(metadata, f, indent=2)
+
+    @classmethod
+    def load(cls, directory, mmap_mode=None):
+        """Returns a WaveformCollection object loaded from a directory written by the
+        save() method. The arrays are numpy.ndarray objects, or numpy.memmap objects
+        of the files if mmap_mode is given (see numpy.load)."""
+        with open(os.path.join(directory, cls.METADATA_FILE)) as f:
+            metadata = json.load(f)
+        result = cls()
+        result.idn = Identity(*metadata["idn"]) if metadata["idn"] else None
+        for source, entry in metadata["waveforms"].items():
+            wave_type, field = _WAVEFORM_TYPES[entry["type"]]
+            fields = entry["fields"]
+            if fields["x_scale"] is not None:
+                fields["x_scale"] = XScale(*fields["x_scale"])
+            if fields["y_scale"] is not None:
+                fields["y_scale"] = YScale(*fields["y_scale"])
+            fields[field] = np.load(
+                os.path.join(directory, source + ".npy"), mmap_mode=mmap_mode
+            )
+            result.data[source] = wave_type(**fields)
+        return result
+
+
+class MultiCurveResult(Mapping):
+    """A mapping of resource names to the WaveformCollection objects downloaded from
+    several instruments, along with the errors raised by instruments that failed"""
+
+    def __init__(self):
+        self.collections = {}
+        self.errors = {}
+        self.transfer_stats = None
+
+    def __getitem__(self, item):
+        return self.collections[item]
+
+    def __iter__(self):
+        return iter(self.collections)
+
+    def __len__(self):
+        return len(self.collections)
@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+
+import pyvisa
+from visadore import get
+
+from .api_types import CurveQueryError
+from .api_types import MultiCurveResult
+from .api_types import TransferStats
+
+
+def curve_many(
+    instruments, *, resource_manager=None, max_workers=None, use_pbar=True, **kwargs
+):
+    """
+    Downloads the waveform data available on several instruments concurrently and
+    returns a MultiCurveResult object that maps each resource name to its
+    WaveformCollection. An instrument that fails does not stop the others; its
+    exception is recorded as a CurveQueryError in the errors attribute of the result.
+
+    Parameters:
+        instruments (iterable): Resource name strings or visadore instrument objects.
+        resource_manager (obj or None): An optional pyvisa resource manager object
+            used to connect to resource names. (default: None)
+        max_workers (int or None): The maximum number of instruments downloaded at
+            once. If None, all instruments are downloaded at once. (default: None)
+        use_pbar (bool): Optionally display a progress bar for each instrument.
+            (default: True)
+        kwargs: Additional keyword arguments passed to the curve feature of each
+            instrument.
+    """
+    instruments = list(instruments)
+    if resource_manager is None and any(isinstance(i, str) for i in instruments):
+        resource_manager = pyvisa.ResourceManager()
+
+    def download(position, instrument):
+        """Downloads the waveform data from a single instrument"""
+        if isinstance(instrument, str):
+            instrument = get(instrument, resource_manager=resource_manager)
+        return instrument.curve(
+            use_pbar=use_pbar,
+            pbar_desc=instrument.rsrc_name,
+            pbar_position=position,
+            **kwargs,
+        )
+
+    result = MultiCurveResult()
+    start_time = time()
+    with ThreadPoolExecutor(max_workers=max_workers or len(instruments) or 1) as pool:
+        futures = {
+            _resource_name(instrument): pool.submit(download, position, instrument)
+            for position, instrument in enumerate(instruments)
+        }
+        for name, future in futures.items():
+            try:
+                result.collections[name] = future.result()
+            except Exception as error:
+                result.errors[name] = CurveQueryError(
+                    "Curve query failed: {}".format(error),
+                    inst=name,
+                    events=getattr(error, "events", None),
+                )
+                result.errors[name].__cause__ = error
+
+    # The aggregate rate is limited by the slowest instrument, not the sum of them
+    result.transfer_stats = TransferStats(
+        sum(c.transfer_stats.bytes for c in result.collections.values()),
+        time() - start_time,
+    )
+    return result
+
+
+def _resource_name(instrument):
+    """Returns the resource name of a resource name string or instrument object"""
+    return instrument if isinstance(instrument, str) else instrument.rsrc_name
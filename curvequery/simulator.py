@@ -0,0 +1,508 @@
+import contextlib
+import time
+
+import numpy as np
+import pyvisa
+from pyvisa import constants
+from pyvisa import util
+
+# The number of samples of the pattern that is repeated to fill each record
+PATTERN_LENGTH = 1 << 16
+
+# The vertical divisions spanned by the full range of the waveform codes
+DIVISIONS = 10
+
+
+class _SimulatedVisaLibrary:
+    """The subset of a pyvisa VisaLibrary used by the curvequery block readers"""
+
+    def __init__(self, resource):
+        self.resource = resource
+
+    def read(self, session, count):
+        """Returns up to count bytes of the pending response and a status code,
+        taking as long as the link throughput of the instrument allows"""
+        return self.resource.instrument.read_chunk(count)
+
+
+class SimulatedMSO:
+    """
+    A simulated MSO series oscilloscope that answers the commands sent by the
+    curvequery features, so that curvequery can be tested and its host side
+    performance measured without an instrument. Commands must be sent in their long
+    or mixed case form; headers are matched without regard to case.
+
+    Analog channels send a noisy sine wave, DCH channels send random words on their
+    eight digital lines, and math waveforms send a floating point sine wave. Each
+    acquisition generates new waveforms. Curve queries send every Nth sample of the
+    record when DATa:RESample is set to N. When FastFrame is turned on, each
+    acquisition holds HORizontal:FASTframe:COUNt frames and curve queries send the
+    frames from DATa:FRAMESTARt to DATa:FRAMESTOP one after another. A query that
+    the simulation does not know adds an event to the event queue and times out,
+    like an unsupported query sent to an actual instrument.
+
+    Parameters:
+        model (str): The model in the identification string. (default: "MSO58")
+        record_length (int): The number of samples in each record. (default: 10000)
+        analog (list): The names of the analog channels. (default: ["CH1", "CH2"])
+        digital (list): The names of the DCH channels, each of which has eight
+            digital lines. (default: ["CH3"])
+        math (list): The names of the math waveforms. (default: ["MATH1"])
+        throughput (float or None): The link throughput in bytes per second. If
+            None, responses are sent as fast as they are read. (default: None)
+        latency (float): The time in seconds taken by each query. (default: 0.0)
+        seed (int): The seed of the random parts of the waveforms. (default: 0)
+    """
+
+    def __init__(
+        self,
+        *,
+        model="MSO58",
+        record_length=10000,
+        analog=("CH1", "CH2"),
+        digital=("CH3",),
+        math=("MATH1",),
+        throughput=None,
+        latency=0.0,
+        seed=0,
+    ):
+        self.model = model
+        self.analog = list(analog)
+        self.digital = list(digital)
+        self.math = list(math)
+        self.throughput = throughput
+        self.latency = latency
+        self.seed = seed
+        self.default_record_length = record_length
+        self.queries = 0
+        self.bytes_sent = 0
+        self.reset()
+
+    def reset(self):
+        """Returns the simulated instrument to its default setup"""
+        self.settings = {
+            "horizontal:recordlength": str(self.default_record_length),
+            "horizontal:mode:samplerate": "6.25E+9",
+            "acquire:state": "1",
+            "acquire:stopafter": "RUNSTOP",
+            "data:source": "CH1",
+            "data:encdg": "RIBinary",
+            "data:start": "1",
+            "data:stop": str(self.default_record_length),
+            "data:resample": "1",
+            "wfmoutpre:bit_nr": "16",
+            "horizontal:fastframe:state": "0",
+            "horizontal:fastframe:count": "1",
+            "data:framestart": "1",
+            "data:framestop": "1",
+        }
+        for channel in self.analog:
+            self.settings["{}:scale".format(channel.lower())] = "1.0E+0"
+            self.settings["{}:position".format(channel.lower())] = "0.0E+0"
+        self.acquisitions = 0
+        self.events = []
+        # The unread part of the pending response. Reads slice the view, which does
+        # not copy the rest of a large response.
+        self.output = memoryview(b"")
+        self._waveforms = {}
+
+    @property
+    def record_length(self):
+        return int(self.settings["horizontal:recordlength"])
+
+    @property
+    def frame_count(self):
+        """The number of frames in each acquisition"""
+        if self.settings["horizontal:fastframe:state"] == "1":
+            return int(self.settings["horizontal:fastframe:count"])
+        return 1
+
+    @property
+    def sources(self):
+        """The names of the sources available for download"""
+        digital = [
+            "{}_D{}".format(channel, bit)
+            for channel in self.digital
+            for bit in range(8)
+        ]
+        return self.analog + digital + self.math
+
+    def acquire(self):
+        """Completes an acquisition, which replaces the waveforms"""
+        self.acquisitions += 1
+        self._waveforms.clear()
+
+    def waveform(self, channel):
+        """Returns the waveform of the channel as the 16-bit codes of an analog or
+        DCH channel, or the float32 values of a math waveform. When FastFrame is
+        turned on, the frames of the acquisition follow one another."""
+        length = self.record_length * self.frame_count
+        if len(self._waveforms.get(channel, ())) != length:
+            self._waveforms[channel] = np.resize(self._pattern(channel, length), length)
+        return self._waveforms[channel]
+
+    def _pattern(self, channel, length):
+        """Returns the repeated part of a waveform of the channel with the given
+        length"""
+        channels = self.analog + self.digital + self.math
+        rng = np.random.default_rng(
+            [self.seed, channels.index(channel), self.acquisitions]
+        )
+        size = min(length, PATTERN_LENGTH)
+        phase = 2 * np.pi * np.arange(size) / 1000 + rng.uniform(0, 2 * np.pi)
+        if channel in self.math:
+            return np.sin(phase).astype(np.float32)
+        if channel in self.digital:
+            # Each digital line occupies every other bit of a DCH code
+            words = rng.integers(0, 256, size, dtype=np.uint16)
+            codes = np.zeros(size, dtype=np.uint16)
+            for bit in range(8):
+                codes |= ((words >> bit) & 1) << (2 * bit)
+            return codes.astype(np.int16)
+        noise = rng.normal(0, 500, size)
+        return np.clip(20000 * np.sin(phase) + noise, -32768, 32767).astype(np.int16)
+
+    def _block(self):
+        """Returns the IEEE 488.2 block sent in response to a curve query"""
+        source = self.settings["data:source"].upper()
+        channel = source if source in self.math else source.split("_")[0]
+        if channel not in self.analog + self.digital + self.math:
+            raise KeyError(source)
+        first = int(self.settings["data:start"]) - 1
+        stop = min(int(self.settings["data:stop"]), self.record_length)
+        frames = self.waveform(channel).reshape(-1, self.record_length)
+        if self.frame_count > 1:
+            first_frame = int(self.settings["data:framestart"]) - 1
+            stop_frame = min(int(self.settings["data:framestop"]), self.frame_count)
+            if not 0 <= first_frame < stop_frame:
+                raise KeyError(source)
+            frames = frames[first_frame:stop_frame]
+        values = frames[:, first : stop : self._resample].reshape(-1)
+        encoding = self.settings["data:encdg"].upper()
+        if channel in self.math:
+            values = values.astype(">f4")
+        elif self.settings["wfmoutpre:bit_nr"] == "8" and channel in self.analog:
+            values = (values >> 8).astype(">i1")
+        elif encoding.startswith("RP"):
+            values = (values.astype(np.int32) + 32768).astype(">u2")
+        else:
+            values = values.astype(">i2")
+        if encoding.startswith("ASC"):
+            return ",".join(str(i) for i in values.tolist()).encode()
+        data = values.tobytes()
+        length = str(len(data)).encode()
+        return b"#" + str(len(length)).encode() + length + data
+
+    @property
+    def _resample(self):
+        """The interval between the samples sent by a curve query"""
+        return int(self.settings["data:resample"])
+
+    def _y_mult(self, source):
+        """Returns the vertical scale factor of the waveform codes of the source"""
+        channel = source.split("_")[0]
+        if channel not in self.analog:
+            return 1.0
+        scale = float(self.settings["{}:scale".format(channel.lower())])
+        return DIVISIONS * scale / (1 << int(self.settings["wfmoutpre:bit_nr"]))
+
+    def _timestamp(self, argument):
+        """Returns the response to a FastFrame timestamp query of a channel and a
+        frame, in which each frame is triggered one millisecond after the last"""
+        channel, _, frame = argument.partition(",")
+        if channel.strip().upper() not in self.analog + self.digital + self.math:
+            raise KeyError(channel)
+        if not frame.strip().isdigit() or not 1 <= int(frame) <= self.frame_count:
+            raise KeyError(frame)
+        seconds, milliseconds = divmod(int(frame) - 1, 1000)
+        minutes, seconds = divmod(seconds, 60)
+        return '"17 Oct 2026 {:02d}:{:02d}:{:02d}.{:03d} 000 000 000"'.format(
+            minutes // 60, minutes % 60, seconds, milliseconds
+        )
+
+    def _query(self, header, argument=""):
+        """Returns the response to a single query"""
+        source = self.settings["data:source"].upper()
+        x_incr = 1 / float(self.settings["horizontal:mode:samplerate"])
+        if header == "*idn?":
+            return "TEKTRONIX,{},SIM000001,CF:91.1CT FV:1.0.0".format(self.model)
+        if header == "*opc?":
+            return "1"
+        if header in ("*stb?", "*esr?"):
+            return "0"
+        if header == "evmsg?":
+            if self.events:
+                return self.events.pop(0)
+            return '0,"No events to report - queue empty"'
+        if header == "set?":
+            return ";".join(
+                ":{} {}".format(key.upper(), value)
+                for key, value in self.settings.items()
+            )
+        if header == "data:source:available?":
+            return ",".join(self.sources)
+        if header.startswith("display:global:") and header.endswith(":state?"):
+            return "1"
+        if header == "horizontal:fastframe:timestamp:frame?":
+            return self._timestamp(argument)
+        if header == "wfmoutpre:xincr?":
+            return repr(x_incr * self._resample)
+        if header == "wfmoutpre:pt_off?":
+            return "0"
+        if header == "wfmoutpre:xzero?":
+            return repr(-x_incr * (self.record_length // 2))
+        if header == "wfmoutpre:xunit?":
+            return '"s"'
+        if header == "wfmoutpre:ymult?":
+            return repr(self._y_mult(source))
+        if header in ("wfmoutpre:yzero?", "wfmoutpre:yoff?"):
+            return "0.0E+0"
+        if header == "wfmoutpre:nr_pt?":
+            first = int(self.settings["data:start"]) - 1
+            stop = min(int(self.settings["data:stop"]), self.record_length)
+            return str(len(range(first, stop, self._resample)))
+        if header[:-1] in self.settings:
+            return self.settings[header[:-1]]
+        raise KeyError(header)
+
+    def _command(self, header, argument):
+        """Performs a single command"""
+        if header == "*rst":
+            self.reset()
+        elif header in ("*cls", "*opc", "*wai"):
+            pass
+        elif header == "acquire:state":
+            run = argument.upper() in ("RUN", "ON", "1")
+            if run and self.settings["acquire:state"] == "0":
+                self.acquire()
+            # A single sequence is complete as soon as it starts
+            single = self.settings["acquire:stopafter"].upper().startswith("SEQ")
+            self.settings[header] = "1" if run and not single else "0"
+        elif header == "horizontal:fastframe:state":
+            self.settings[header] = "1" if argument.upper() in ("ON", "1") else "0"
+        else:
+            self.settings[header] = argument
+
+    def _add_event(self, code, message):
+        """Adds an event to the event queue. Commas are left out of the message, so
+        that the number and the message can be split at the first comma."""
+        self.events.append('{},"{}"'.format(code, message.replace(",", " ")))
+
+    def _timeout(self, message):
+        """Adds an event and raises the exception of a timed out VISA read"""
+        self._add_event(410, "Query INTERRUPTED; {}".format(message))
+        raise pyvisa.errors.VisaIOError(constants.StatusCode.error_timeout)
+
+    def write(self, message):
+        """Performs the commands of a message and queues the responses to its
+        queries"""
+        responses = []
+        for part in message.strip().split(";"):
+            header, _, argument = part.strip().lstrip(":").partition(" ")
+            header = header.lower()
+            try:
+                if header in ("curv?", "curve?"):
+                    self.output = memoryview(self._block() + b"\n")
+                    return
+                if header.endswith("?"):
+                    responses.append(self._query(header, argument.strip()))
+                elif header:
+                    self._command(header, argument.strip())
+            except KeyError:
+                self.output = memoryview(b"")
+                self._add_event(113, "Undefined header; {}".format(part))
+                return
+        if responses:
+            self.output = memoryview((";".join(responses) + "\n").encode())
+
+    def read_chunk(self, count):
+        """Returns up to count bytes of the pending response and a status code"""
+        if not self.output:
+            self._timeout("no response is pending")
+        chunk, self.output = bytes(self.output[:count]), self.output[count:]
+        if self.throughput:
+            time.sleep(len(chunk) / self.throughput)
+        self.bytes_sent += len(chunk)
+        if self.output:
+            return chunk, constants.StatusCode.success_max_count_read
+        return chunk, constants.StatusCode.success_termination_character_read
+
+
+class SimulatedMDO(SimulatedMSO):
+    """
+    A simulated MDO3000 or MDO4000C series oscilloscope. It answers the commands sent
+    by the curve feature of these instruments, which select the sources with the
+    SELect commands and the sample width with the DATa:WIDth command.
+
+    Only the response to the SELect? query includes headers when they are turned on.
+    Sources that are not analog channels are listed as turned off.
+
+    Parameters:
+        model (str): The model in the identification string. (default: "MDO3104")
+        analog (list): The names of the analog channels.
+            (default: ["CH1", "CH2", "CH3", "CH4"])
+        kwargs: The other arguments of a SimulatedMSO object. There are no DCH
+            channels or math waveforms by default.
+    """
+
+    def __init__(
+        self,
+        *,
+        model="MDO3104",
+        analog=("CH1", "CH2", "CH3", "CH4"),
+        digital=(),
+        math=(),
+        **kwargs,
+    ):
+        super().__init__(
+            model=model, analog=analog, digital=digital, math=math, **kwargs
+        )
+
+    def reset(self):
+        super().reset()
+        self.settings["header"] = "1"
+        self.settings["data:width"] = "2"
+        for channel in self.analog:
+            self.settings["select:{}".format(channel.lower())] = "1"
+
+    def _select(self):
+        """Returns the response to a SELect? query"""
+        states = [
+            "{} {}".format(channel, self.settings["select:{}".format(channel.lower())])
+            for channel in self.analog
+        ]
+        states += ["MATH 0", "REF1 0", "BUS1 0", "CONTROL {}".format(self.analog[0])]
+        if self.settings["header"].upper() in ("ON", "1"):
+            return ":SELECT:" + ";".join(states)
+        return ";".join(state.split(" ")[1] for state in states)
+
+    def _query(self, header, argument=""):
+        encoding = self.settings["data:encdg"].upper()
+        if header == "select?":
+            return self._select()
+        if header == "wfmoutpre:byt_nr?":
+            return self.settings["data:width"]
+        if header == "wfmoutpre:bn_fmt?":
+            return "RP" if encoding.startswith("RP") else "RI"
+        if header == "wfmoutpre:byt_or?":
+            return "MSB"
+        if header == "wfmoutpre:encdg?":
+            return "ASCII" if encoding.startswith("ASC") else "BINARY"
+        return super()._query(header, argument)
+
+    def _command(self, header, argument):
+        if header.startswith("select:"):
+            on = argument.upper() in ("ON", "1")
+            self.settings[header] = "1" if on else "0"
+        elif header == "data:width":
+            # The sample width sets the resolution of the codes
+            self.settings[header] = argument
+            self.settings["wfmoutpre:bit_nr"] = str(8 * int(argument))
+        else:
+            super()._command(header, argument)
+
+
+class SimulatedResource:
+    """A session with a SimulatedMSO object that provides the parts of a pyvisa
+    MessageBasedResource used by the curvequery features"""
+
+    def __init__(self, instrument, resource_name):
+        self.instrument = instrument
+        self._resource_name = resource_name
+        self._read_termination = "\n"
+        self.session = id(self)
+        self.visalib = _SimulatedVisaLibrary(self)
+        self.timeout = 2000
+        self.chunk_size = 20 * 1024
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        pass
+
+    def clear(self):
+        self.instrument.output = memoryview(b"")
+
+    @contextlib.contextmanager
+    def ignore_warning(self, *warnings_constants):
+        yield
+
+    def write(self, message):
+        self.instrument.write(message)
+        return len(message)
+
+    def read_raw(self):
+        """Returns the whole pending response"""
+        chunk, status = self.visalib.read(self.session, self.chunk_size)
+        data = bytearray(chunk)
+        while status == constants.StatusCode.success_max_count_read:
+            chunk, status = self.visalib.read(self.session, self.chunk_size)
+            data.extend(chunk)
+        return bytes(data)
+
+    def read(self):
+        return self.read_raw().decode().rstrip(self._read_termination)
+
+    def query(self, message):
+        self.instrument.queries += 1
+        if self.instrument.latency:
+            time.sleep(self.instrument.latency)
+        self.write(message)
+        return self.read()
+
+    def query_binary_values(
+        self,
+        message,
+        datatype="f",
+        is_big_endian=False,
+        container=list,
+        **kwargs,
+    ):
+        self.instrument.queries += 1
+        if self.instrument.latency:
+            time.sleep(self.instrument.latency)
+        self.write(message)
+        return util.from_ieee_block(self.read_raw(), datatype, is_big_endian, container)
+
+
+class SimulatedResourceManager:
+    """
+    A stand-in for a pyvisa ResourceManager object whose resources are simulated
+    instruments. Pass it to visadore.get() to use the curvequery features without an
+    instrument:
+
+        >>> from visadore import get
+        >>> from curvequery.simulator import SimulatedResourceManager
+        >>> oscope = get("SIM::INSTR", resource_manager=SimulatedResourceManager())
+
+    Parameters:
+        simulation (class): The class of the simulated instruments, such as
+            SimulatedMSO or SimulatedMDO. (default: SimulatedMSO)
+        kwargs: The arguments of the simulated instrument created for each resource
+            name.
+    """
+
+    def __init__(self, simulation=SimulatedMSO, **kwargs):
+        self.simulation = simulation
+        self.kwargs = kwargs
+        self.instruments = {}
+
+    def instrument(self, resource_name):
+        """Returns the simulated instrument of a resource name, creating it if
+        needed"""
+        if resource_name not in self.instruments:
+            self.instruments[resource_name] = self.simulation(**self.kwargs)
+        return self.instruments[resource_name]
+
+    def open_resource(self, resource_name, **kwargs):
+        return SimulatedResource(self.instrument(resource_name), resource_name)
+
+    def list_resources(self, query="?*::INSTR"):
+        return tuple(self.instruments)
+
+    def close(self):
+        pass
@@ -0,0 +1,34 @@
+import pytest
+
+from curvequery import curve_many
+from curvequery.api_types import CurveQueryError
+from curvequery.api_types import WaveformCollection
+
+INVALID_RESOURCE = "TCPIP::0.0.0.0::INSTR"
+
+
+@pytest.fixture(scope="session")
+def resource_names(request):
+    names = request.config.option.resource
+    if not names:
+        pytest.skip("no resources provided")
+    return names
+
+
+def test_curve_many_returns_collections(resource_names):
+    """Verify a waveform collection is returned for each instrument"""
+    result = curve_many(resource_names)
+    assert sorted(result) == sorted(resource_names)
+    for name in resource_names:
+        assert isinstance(result[name], WaveformCollection)
+        assert result[name].transfer_stats.bytes > 0
+    assert result.transfer_stats.bytes == sum(
+        result[name].transfer_stats.bytes for name in resource_names
+    )
+
+
+def test_curve_many_isolates_errors(resource_names):
+    """Verify an instrument that fails does not prevent the others from downloading"""
+    result = curve_many(resource_names + [INVALID_RESOURCE])
+    assert sorted(result) == sorted(resource_names)
+    assert isinstance(result.errors[INVALID_RESOURCE], CurveQueryError)
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from curvequery.api_types import PackedWaveform
+from curvequery.api_types import RawWaveform
+
+# noinspection PyProtectedMember
+from curvequery._post_process import scale_analog
+from curvequery._post_process import BLOCK_SIZE
+from curvequery._post_process import digital_bits
+from curvequery._post_process import digital_byte
+from curvequery._post_process import fits_in_8_bits
+from curvequery._post_process import min_max_envelope
+
+
+@pytest.fixture(scope="module")
+def dch_codes():
+    """DCH codes with a pseudo-random value on each of the eight digital lines"""
+    rng = np.random.default_rng(1)
+    return (rng.integers(0, 1 << 15, 2 * BLOCK_SIZE + 13) & 0x5555).astype(np.int16)
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_scale_analog_matches_formula(dtype):
+    """Verify the scaled values match the vertical scaling formula"""
+    codes = np.resize(np.arange(-32768, 32767, dtype=">i2"), 3 * BLOCK_SIZE + 7)
+    actual = scale_analog(codes, 1.5e-4, 0.25, 12.0, dtype=dtype)
+    expected = (codes.astype(np.float64) - 12.0) * 1.5e-4 + 0.25
+    assert actual.dtype == dtype
+    assert np.allclose(actual, expected, rtol=1e-6, atol=1e-6)
+
+
+def test_scale_analog_in_place():
+    """Verify floating point codes of the requested type are scaled in place"""
+    codes = np.array([1.0, 2.0, 3.0], dtype=np.float32)
+    actual = scale_analog(codes, 2.0, 1.0, dtype=np.float32)
+    assert actual is codes
+    assert actual.tolist() == [3.0, 5.0, 7.0]
+
+
+def test_raw_waveform_data_is_scaled():
+    """Verify a raw waveform converts its codes into vertical units on access"""
+    codes = np.array([-2, 0, 2], dtype=np.int16)
+    wave = RawWaveform(codes, None, None, 0.5, 1.0)
+    assert wave.data.tolist() == [0.0, 1.0, 2.0]
+    assert wave.scaled(np.float32).dtype == np.float32
+    assert wave.raw_data is codes
+
+
+def test_digital_byte_gathers_even_bits(dch_codes):
+    """Verify bit n of each word is bit 2n of the corresponding code"""
+    actual = digital_byte(dch_codes)
+    expected = sum(((dch_codes >> (2 * bit)) & 1) << bit for bit in range(8))
+    assert actual.dtype == np.uint8
+    assert np.array_equal(actual, expected)
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_digital_bits_match_shifted_codes(dch_codes, packed):
+    """Verify each requested bit is extracted from the codes"""
+    actual = digital_bits(dch_codes, [0, 3, 7], packed)
+    assert list(actual.keys()) == [0, 3, 7]
+    for bit, bit_data in actual.items():
+        if packed:
+            bit_data = PackedWaveform(bit_data, len(dch_codes), None, None).data
+        assert np.array_equal(bit_data, (dch_codes >> (2 * bit)) & 1)
+
+
+@pytest.mark.parametrize("dtype", [">i2", "<i2"])
+def test_fits_in_8_bits(dtype):
+    """Verify only codes with a zero low byte fit in 8 bits"""
+    codes = (np.arange(-128, 128) * 256).astype(dtype)
+    assert fits_in_8_bits(np.resize(codes, 2 * BLOCK_SIZE))
+    codes[-1] += 1
+    assert not fits_in_8_bits(np.resize(codes, 2 * BLOCK_SIZE))
+
+
+@pytest.mark.parametrize("size", [1000, 1003])
+def test_min_max_envelope(size):
+    """Verify each row holds the minimum and maximum of its bin, including a short
+    last bin"""
+    data = np.random.default_rng(0).normal(size=size)
+    actual = min_max_envelope(data, 10)
+    expected = [
+        [data[i : i + 10].min(), data[i : i + 10].max()] for i in range(0, size, 10)
+    ]
+    assert actual.tolist() == expected
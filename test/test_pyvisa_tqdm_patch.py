@@ -0,0 +1,86 @@
+import contextlib
+
+import numpy as np
+import pytest
+from pyvisa import constants
+from pyvisa import errors
+
+from curvequery._pyvisa_tqdm_patch import read_ieee_block_progress_bar
+
+
+class BlockInstrument:
+    """An instrument that sends a response a few bytes at a time"""
+
+    _resource_name = "BLOCK"
+    _read_termination = "\n"
+    chunk_size = 7
+    session = None
+
+    class ProgressBar:
+        n = 0
+
+        def update(self, n):
+            self.n += n
+
+    def __init__(self, response, max_read=5):
+        self.response = response
+        self.max_read = max_read
+        self.reads = 0
+        self.visalib = self
+        self.progress_bar = self.ProgressBar()
+
+    def read(self, session, size):
+        self.reads += 1
+        size = min(size, self.max_read)
+        chunk, self.response = self.response[:size], self.response[size:]
+        return chunk, constants.StatusCode.success
+
+    @contextlib.contextmanager
+    def ignore_warning(self, *warnings):
+        yield
+
+
+def ieee_block(data):
+    """Returns the IEEE 488.2 definite length block of the data"""
+    length = str(len(data)).encode()
+    return b"#" + str(len(length)).encode() + length + data + b"\n"
+
+
+@pytest.mark.parametrize("datatype", ["h", "f"])
+def test_read_ieee_block(datatype):
+    """Verify the values of the block are decoded and the whole response is read"""
+    expected = np.arange(-50, 50).astype(">" + datatype)
+    response = ieee_block(expected.tobytes())
+    instr = BlockInstrument(response)
+    actual = read_ieee_block_progress_bar(instr, datatype, is_big_endian=True)
+    assert np.array_equal(actual, expected)
+    assert instr.response == b""
+    assert instr.progress_bar.n == expected.nbytes
+
+
+def test_read_ieee_block_reads_header_with_data():
+    """Verify the header does not cost extra reads and a small block with its
+    termination is read in a single chunk"""
+    expected = np.arange(10).astype(">h")
+    instr = BlockInstrument(ieee_block(expected.tobytes()), max_read=1024)
+    instr.chunk_size = 1024
+    actual = read_ieee_block_progress_bar(instr, "h", is_big_endian=True)
+    assert np.array_equal(actual, expected)
+    assert instr.reads == 1
+    assert instr.progress_bar.n == expected.nbytes
+
+
+def test_read_ieee_block_skips_leading_bytes():
+    """Verify bytes sent before the start of the block are skipped"""
+    expected = np.arange(10).astype("<h")
+    instr = BlockInstrument(b"\n" + ieee_block(expected.tobytes()), max_read=1)
+    actual = read_ieee_block_progress_bar(instr, "h")
+    assert np.array_equal(actual, expected)
+    assert instr.response == b""
+
+
+def test_read_ieee_block_rejects_indefinite_length():
+    """Verify an indefinite length block raises InvalidBinaryFormat"""
+    instr = BlockInstrument(b"#0\x00\x01\n")
+    with pytest.raises(errors.InvalidBinaryFormat):
+        read_ieee_block_progress_bar(instr, "h")
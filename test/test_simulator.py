@@ -0,0 +1,277 @@
+import numpy as np
+import pytest
+from pyvisa.errors import VisaIOError
+from visadore import get
+
+from curvequery.api_types import WaveformCollection
+from curvequery._tek_series_mso import get_event_queue
+from curvequery.simulator import SimulatedResourceManager
+
+RESOURCE_NAME = "SIM::INSTR"
+
+
+@pytest.fixture
+def rm():
+    return SimulatedResourceManager(record_length=5000)
+
+
+@pytest.fixture
+def sim(rm):
+    result = rm.instrument(RESOURCE_NAME)
+    # Stop acquiring so the waveforms do not change after each download
+    result.write("ACQuire:STATE STOP")
+    return result
+
+
+@pytest.fixture
+def osc(rm, sim):
+    return get(RESOURCE_NAME, resource_manager=rm)
+
+
+def test_identity(osc):
+    assert osc.idn.model == "MSO58"
+    assert "curve" in osc.features
+
+
+def test_curve_analog(osc, sim):
+    result = osc.curve(use_pbar=False, as_ndarray=True)
+    assert result.sources == sim.sources
+    expected = sim.waveform("CH1") * (10 / 65536)
+    np.testing.assert_allclose(result["CH1"].data, expected)
+    assert result["CH1"].x_scale.slope == pytest.approx(1.6e-10)
+    assert result["CH1"].y_scale.top == pytest.approx(5.0)
+
+
+def test_curve_8_bits(osc, sim):
+    result = osc.curve(use_pbar=False, as_ndarray=True, bit_nr=8, sources=["CH2"])
+    expected = (sim.waveform("CH2") >> 8) * (10 / 256)
+    np.testing.assert_allclose(result["CH2"].data, expected)
+
+
+def test_curve_digital_and_math(osc, sim):
+    result = osc.curve(use_pbar=False, as_ndarray=True, sources=["CH3", "MATH1"])
+    codes = sim.waveform("CH3")
+    for bit in range(8):
+        expected = (codes >> (2 * bit)) & 1
+        np.testing.assert_array_equal(result["CH3_D{}".format(bit)].data, expected)
+    np.testing.assert_allclose(result["MATH1"].data, sim.waveform("MATH1"))
+
+
+def test_curve_window(osc, sim):
+    result = osc.curve(use_pbar=False, as_ndarray=True, start=100, stop=200)
+    np.testing.assert_allclose(
+        result["CH1"].data, sim.waveform("CH1")[100:200] * (10 / 65536)
+    )
+
+
+def test_acquire_replaces_waveforms(osc, sim):
+    before = sim.waveform("CH1").copy()
+    for _ in osc.acquire(count=2, wait="poll"):
+        pass
+    assert sim.acquisitions == 2
+    assert not np.array_equal(sim.waveform("CH1"), before)
+
+
+def test_ascii_encoding(rm, sim):
+    with rm.open_resource(RESOURCE_NAME) as inst:
+        inst.write("data:source CH1;:data:encdg ASCIi;:data:start 1;:data:stop 10")
+        values = [int(i) for i in inst.query("curv?").split(",")]
+    assert values == sim.waveform("CH1")[:10].tolist()
+
+
+def test_unknown_query(rm, sim):
+    with rm.open_resource(RESOURCE_NAME) as inst:
+        with pytest.raises(VisaIOError):
+            inst.query("NOT:A:COMMAND?")
+        assert inst.query("EVMSG?").startswith("113,")
+
+
+def test_throughput():
+    rm = SimulatedResourceManager(record_length=100000, throughput=10e6)
+    osc = get(RESOURCE_NAME, resource_manager=rm)
+    result = osc.curve(use_pbar=False, sources=["CH1"])
+    assert result.transfer_stats.bytes == 200000
+    assert result.transfer_stats.seconds >= 0.02
+
+
+def test_transfer_time_excludes_queries():
+    rm = SimulatedResourceManager(record_length=1000, latency=0.02)
+    osc = get(RESOURCE_NAME, resource_manager=rm)
+    result = osc.curve(use_pbar=False, sources=["CH1"])
+    assert result.transfer_stats.bytes == 2000
+    assert result.transfer_stats.seconds < 0.02
+
+
+@pytest.mark.parametrize(
+    "window", [{"start_time": 1.0}, {"start": 10, "stop": 5}, {"start": 6000}]
+)
+def test_curve_empty_window_restores_acquisition(rm, window):
+    sim = rm.instrument(RESOURCE_NAME)
+    osc = get(RESOURCE_NAME, resource_manager=rm)
+    with pytest.raises(ValueError):
+        osc.curve(use_pbar=False, **window)
+    assert sim.settings["acquire:state"] == "1"
+
+
+def test_curve_auto_bit_nr_probes_stopped_acquisition(rm, monkeypatch):
+    sim = rm.instrument(RESOURCE_NAME)
+    osc = get(RESOURCE_NAME, resource_manager=rm)
+    messages = []
+    write = sim.write
+    monkeypatch.setattr(sim, "write", lambda m: messages.append(m) or write(m))
+    osc.curve(use_pbar=False, bit_nr="auto", sources=["CH1"])
+    # The width is probed on the acquisition that is downloaded
+    assert messages.index("ACQuire:STATE STOP") < messages.index("curv?")
+
+
+def test_preview_decimate(osc, sim):
+    result = osc.preview(points=100, method="decimate")
+    assert result.sources == sim.sources
+    expected = sim.waveform("CH1")[::50] * (10 / 65536)
+    np.testing.assert_allclose(result["CH1"].data, expected)
+    assert result["CH1"].x_scale.slope == pytest.approx(1.6e-10 * 50)
+    assert sim.settings["data:resample"] == "1"
+
+
+def test_resample(rm, sim):
+    with rm.open_resource(RESOURCE_NAME) as inst:
+        inst.write("data:source CH1;:data:resample 7;:data:start 11;:data:stop 100")
+        assert inst.query("wfmoutpre:nr_pt?") == "13"
+        assert float(inst.query("wfmoutpre:xincr?")) == pytest.approx(1.6e-10 * 7)
+        values = inst.query_binary_values("curv?", datatype="h", is_big_endian=True)
+    assert values == sim.waveform("CH1")[10:100:7].tolist()
+
+
+def test_read_in_small_chunks(rm, sim):
+    with rm.open_resource(RESOURCE_NAME) as inst:
+        inst.chunk_size = 7
+        values = inst.query_binary_values("curv?", datatype="h", is_big_endian=True)
+    assert values == sim.waveform("CH1").tolist()
+    assert not sim.output
+
+
+def test_fastframe(rm, sim):
+    sim.write("HORizontal:FASTframe:STATE ON;:HORizontal:FASTframe:COUNt 4")
+    frames = sim.waveform("CH1").reshape(4, -1)
+    assert not np.array_equal(frames[0], frames[1])
+    with rm.open_resource(RESOURCE_NAME) as inst:
+        inst.write("data:source CH1;:data:framestart 2;:data:framestop 3")
+        inst.write("data:start 11;:data:stop 20")
+        values = inst.query_binary_values("curv?", datatype="h", is_big_endian=True)
+        timestamp = inst.query("HORizontal:FASTframe:TIMEStamp:FRAMe? CH1,4")
+    assert values == frames[1:3, 10:20].reshape(-1).tolist()
+    assert timestamp == '"17 Oct 2026 00:00:00.003 000 000 000"'
+
+
+def test_event_queue_of_command_with_commas(rm, sim):
+    with rm.open_resource(RESOURCE_NAME) as inst:
+        with pytest.raises(VisaIOError):
+            inst.query("HORizontal:FASTframe:TIMEStamp:FRAMe? CH1,2")
+        events = get_event_queue(inst, verbose=False)
+    assert events[0].startswith('113,"Undefined header;')
+    assert events[-1].startswith("0,")
+
+
+@pytest.fixture
+def fastframe(sim):
+    sim.write("HORizontal:FASTframe:STATE ON;:HORizontal:FASTframe:COUNt 10")
+    return sim.waveform("CH1").reshape(10, -1) * (10 / 65536)
+
+
+def test_curve_frames(osc, sim, fastframe):
+    result = osc.curve_frames(use_pbar=False)
+    np.testing.assert_allclose(result["CH1"].data, fastframe)
+    assert result["CH1"].timestamps[1] == "17 Oct 2026 00:00:00.001 000 000 000"
+    # CH1, CH2 and CH3 send 2 bytes per sample and MATH1 sends 4
+    assert result.transfer_stats.bytes == 10 * 5000 * 10
+
+    result = osc.curve_frames(
+        use_pbar=False, start_frame=3, stop_frame=5, timestamps=False
+    )
+    np.testing.assert_allclose(result["CH1"].data, fastframe[2:5])
+    assert sim.settings["data:framestart"] == "1"
+    assert sim.settings["data:framestop"] == "1"
+
+
+def test_curve_frames_transfer_time_excludes_queries(osc, sim, fastframe):
+    sim.latency = 0.05
+    result = osc.curve_frames(use_pbar=False)
+    assert result.transfer_stats.seconds < 0.05
+
+
+def test_curve_frames_failure_restores_acquisition(osc, sim, fastframe, monkeypatch):
+    sim.write("ACQuire:STATE RUN")
+
+    def fail(argument):
+        raise KeyError(argument)
+
+    monkeypatch.setattr(sim, "_timestamp", fail)
+    with pytest.raises(VisaIOError):
+        osc.curve_frames(use_pbar=False)
+    assert sim.settings["acquire:state"] == "1"
+
+
+def test_curve_frames_stop_frame_out_of_range(osc, sim, fastframe, monkeypatch):
+    sim.write("ACQuire:STATE RUN")
+    messages = []
+    write = sim.write
+    monkeypatch.setattr(sim, "write", lambda m: messages.append(m) or write(m))
+    with pytest.raises(ValueError):
+        osc.curve_frames(use_pbar=False, stop_frame=11)
+    # Nothing is changed before the frame range is checked
+    assert not [i for i in messages if not i.rstrip().endswith("?")]
+
+
+def test_curve_to_disk_can_be_loaded(osc, sim, tmp_path):
+    result = osc.curve_to_disk(str(tmp_path), use_pbar=False, chunk_size=1000)
+    assert result.transfer_stats.bytes == 5000 * (2 + 2 + 2 + 4)
+    actual = WaveformCollection.load(str(tmp_path))
+    assert actual.idn == result.idn
+    assert actual.sources == result.sources
+    for source in result.sources:
+        np.testing.assert_array_equal(actual[source].data, result[source].data)
+        assert actual[source].x_scale == result[source].x_scale
+    np.testing.assert_allclose(actual["CH1"].data, sim.waveform("CH1") * (10 / 65536))
+
+
+def test_curve_identity_shares_a_round_trip(osc, sim, monkeypatch):
+    messages = []
+    write = sim.write
+    monkeypatch.setattr(sim, "write", lambda m: messages.append(m) or write(m))
+    result = osc.curve(use_pbar=False, sources=["CH1"])
+    assert result.idn.model == "MSO58"
+    assert "*IDN?" not in messages
+
+
+def test_acquire_curve_transfer_time_excludes_queries(osc, sim):
+    sim.latency = 0.05
+    results = list(osc.acquire_curve(count=2, use_pbar=False, as_ndarray=True))
+    assert sim.acquisitions == 2
+    for result in results:
+        assert result.transfer_stats.seconds < 0.05
+    np.testing.assert_allclose(
+        results[-1]["CH1"].data, sim.waveform("CH1") * (10 / 65536)
+    )
+
+
+@pytest.mark.parametrize("low_byte, expected_bit_nr", [(0, "8"), (1, "16")])
+def test_curve_auto_bit_nr_probes_whole_record(low_byte, expected_bit_nr, monkeypatch):
+    rm = SimulatedResourceManager(record_length=100000)
+    sim = rm.instrument(RESOURCE_NAME)
+    sim.write("ACQuire:STATE STOP")
+    codes = sim.waveform("CH1")
+    codes &= ~0xFF
+    # A late sample that needs 16 bits, well past the start of the record
+    codes[90000] |= low_byte
+    osc = get(RESOURCE_NAME, resource_manager=rm)
+    widths = []
+    block = sim._block
+    monkeypatch.setattr(
+        sim,
+        "_block",
+        lambda: widths.append(sim.settings["wfmoutpre:bit_nr"]) or block(),
+    )
+    result = osc.curve(use_pbar=False, as_ndarray=True, bit_nr="auto", sources=["CH1"])
+    assert widths[-1] == expected_bit_nr
+    np.testing.assert_allclose(result["CH1"].data, codes * (10 / 65536))
+    assert sim.settings["data:resample"] == "1"
@@ -0,0 +1,135 @@
+import numpy as np
+import pytest
+from pyvisa.errors import VisaIOError
+from visadore import get
+
+from curvequery.api_types import YScale
+from curvequery._tek_3k_4k_mso import Preamble
+from curvequery._tek_3k_4k_mso import Tek3k4kCurveFeat
+from curvequery.simulator import SimulatedMDO
+from curvequery.simulator import SimulatedResourceManager
+
+RESOURCE_NAME = "SIM::INSTR"
+
+PREAMBLE = ["2", "RI", "MSB", "BINARY", "10000", "4.0E-10", "0", '"s"']
+PREAMBLE += ["1.5625E-5", "0.0E+0", "0.0E+0"]
+
+
+@pytest.fixture
+def rm():
+    return SimulatedResourceManager(SimulatedMDO, record_length=5000)
+
+
+@pytest.fixture
+def sim(rm):
+    result = rm.instrument(RESOURCE_NAME)
+    # Stop acquiring so the waveforms do not change after each download
+    result.write("ACQuire:STATE STOP")
+    return result
+
+
+@pytest.fixture
+def osc(rm, sim):
+    return get(RESOURCE_NAME, resource_manager=rm)
+
+
+def test_parse_select():
+    response = ":SELECT:CH1 1;CH2 0;CH3 1;MATH 1;REF1 0;BUS1 1;D0 1;CONTROL CH1"
+    assert Tek3k4kCurveFeat._parse_select(response) == ["CH1", "CH3", "MATH", "D0"]
+
+
+def test_parse_select_all_off():
+    response = ":SELECT:CH1 0;CH2 0;MATH 0;CONTROL NONE"
+    assert Tek3k4kCurveFeat._parse_select(response) == []
+
+
+def test_parse_preamble_channel():
+    preamble = Tek3k4kCurveFeat._parse_preamble(PREAMBLE + ["0.1", "1.0"])
+    assert preamble == Preamble(
+        "2",
+        "RI",
+        "MSB",
+        "BINARY",
+        10000,
+        4e-10,
+        0.0,
+        '"s"',
+        1.5625e-5,
+        0.0,
+        0.0,
+        YScale(pytest.approx(0.4), pytest.approx(-0.6)),
+    )
+
+
+def test_parse_preamble_without_scale():
+    assert Tek3k4kCurveFeat._parse_preamble(PREAMBLE).y_scale is None
+
+
+def test_invalid_encoding():
+    feat = Tek3k4kCurveFeat()
+    with pytest.raises(ValueError):
+        feat.get_feature(None, "resource")(encoding="hex")
+
+
+def test_identity(osc):
+    assert osc.idn.model == "MDO3104"
+    assert "curve" in osc.features
+
+
+@pytest.mark.parametrize("encoding", ["binary", "ascii"])
+def test_curve(osc, sim, encoding):
+    result = osc.curve(use_pbar=False, as_ndarray=True, encoding=encoding)
+    assert result.sources == ["CH1", "CH2", "CH3", "CH4"]
+    for source in result.sources:
+        expected = sim.waveform(source) * (10 / 65536)
+        np.testing.assert_allclose(result[source].data, expected)
+    assert result["CH1"].x_scale.slope == pytest.approx(1.6e-10)
+    assert result["CH1"].x_scale.offset == pytest.approx(-1.6e-10 * 2500)
+    assert result["CH1"].y_scale == YScale(pytest.approx(5.0), pytest.approx(-5.0))
+    assert result.idn.model == "MDO3104"
+
+
+def test_curve_disabled_channel(osc, sim):
+    sim.write("SELect:CH2 OFF")
+    result = osc.curve(use_pbar=False)
+    assert result.sources == ["CH1", "CH3", "CH4"]
+
+
+@pytest.mark.parametrize("encoding", ["binary", "ascii"])
+def test_curve_sources_and_window(osc, sim, encoding):
+    result = osc.curve(
+        use_pbar=False,
+        as_ndarray=True,
+        encoding=encoding,
+        sources=["CH4", "CH2"],
+        start=100,
+        stop=200,
+    )
+    assert result.sources == ["CH2", "CH4"]
+    for source in result.sources:
+        expected = sim.waveform(source)[100:200] * (10 / 65536)
+        np.testing.assert_allclose(result[source].data, expected)
+        assert result[source].x_scale.slope == pytest.approx(1.6e-10)
+        assert result[source].x_scale.offset == pytest.approx(1.6e-10 * (100 - 2500))
+
+
+def test_curve_failure_restores_acquisition(rm, monkeypatch):
+    sim = rm.instrument(RESOURCE_NAME)
+    osc = get(RESOURCE_NAME, resource_manager=rm)
+
+    def fail():
+        raise KeyError("CURVe?")
+
+    monkeypatch.setattr(sim, "_block", fail)
+    with pytest.raises(VisaIOError):
+        osc.curve(use_pbar=False, sources=["CH1"])
+    assert sim.settings["acquire:state"] == "1"
+
+
+def test_curve_identity_shares_a_round_trip(osc, sim, monkeypatch):
+    messages = []
+    write = sim.write
+    monkeypatch.setattr(sim, "write", lambda m: messages.append(m) or write(m))
+    result = osc.curve(use_pbar=False, sources=["CH1"])
+    assert result.idn.model == "MDO3104"
+    assert "*IDN?" not in messages
@@ -0,0 +1,98 @@
+import pyvisa
+import pytest
+
+from curvequery.api_types import SequenceTimeout
+from curvequery._tek_series_mso_acquire_feat import _wait_opc
+from curvequery._tek_series_mso_acquire_feat import _wait_poll
+
+
+class AcquiringInstrument:
+    """An instrument whose acquisition completes after a number of state queries, or
+    whose *OPC? query times out if the acquisition never completes"""
+
+    def __init__(self, busy_queries=0, completes=True):
+        self.busy_queries = busy_queries
+        self.completes = completes
+        self.timeout = 2000
+        self.queries = []
+        self.cleared = False
+
+    def query(self, command):
+        self.queries.append(command)
+        if command == "*OPC?":
+            if not self.completes:
+                raise pyvisa.errors.VisaIOError(
+                    pyvisa.constants.StatusCode.error_timeout
+                )
+            return "1\n"
+        self.busy_queries -= 1
+        return "1\n" if self.busy_queries >= 0 or not self.completes else "0\n"
+
+    def clear(self):
+        self.cleared = True
+
+
+def test_wait_opc_restores_visa_timeout():
+    """Verify a single *OPC? query waits for the sequence and the timeout is restored"""
+    instr = AcquiringInstrument()
+    assert _wait_opc(instr, None)
+    assert instr.queries == ["*OPC?"]
+    assert instr.timeout == 2000
+
+
+def test_wait_opc_timeout():
+    """Verify a timed out *OPC? query clears the pending response"""
+    instr = AcquiringInstrument(completes=False)
+    assert not _wait_opc(instr, 0.5)
+    assert instr.cleared
+    assert instr.timeout == 2000
+
+
+def test_wait_poll():
+    """Verify the poller returns once the acquisition state reports completion"""
+    instr = AcquiringInstrument(busy_queries=5)
+    assert _wait_poll(instr, 5)
+    assert len(instr.queries) == 6
+
+
+def test_wait_poll_timeout():
+    """Verify the poller gives up after the timeout"""
+    assert not _wait_poll(AcquiringInstrument(completes=False), 0.05)
+
+
+@pytest.mark.parametrize("wait", ["opc", "poll"])
+def test_acquire_count(all_series_osc, wait):
+    """Verify each completion mechanism runs the requested number of sequences"""
+    if all_series_osc:
+        all_series_osc.default_setup()
+        all_series_osc.write("TRIGGER:A:EDGE:SOURCE LINE")
+        assert list(all_series_osc.acquire(count=3, wait=wait)) == [1, 2, 3]
+
+
+def test_acquire_timeout(all_series_osc):
+    """Verify a sequence that cannot trigger raises SequenceTimeout"""
+    if all_series_osc:
+        all_series_osc.default_setup()
+        all_series_osc.write("TRIGGER:A:MODE NORMAL")
+        all_series_osc.write("TRIGGER:A:LEVEL:CH1 5")
+        with pytest.raises(SequenceTimeout):
+            for _ in all_series_osc.acquire(count=1, timeout=1):
+                pass
+
+
+@pytest.mark.parametrize("overlap", [False, True])
+def test_acquire_curve(all_series_osc, overlap):
+    """Verify the combined loop yields a waveform collection for each sequence and
+    restores the acquisition state"""
+    if all_series_osc:
+        all_series_osc.default_setup()
+        all_series_osc.write("TRIGGER:A:EDGE:SOURCE LINE")
+        expected_state = all_series_osc.query("ACQUIRE:STATE?")
+        collections = list(
+            all_series_osc.acquire_curve(count=3, overlap=overlap, as_ndarray=True)
+        )
+        assert len(collections) == 3
+        for collection in collections:
+            assert "CH1" in collection.sources
+            assert collection.transfer_stats.bytes > 0
+        assert all_series_osc.query("ACQUIRE:STATE?") == expected_state
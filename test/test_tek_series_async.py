@@ -0,0 +1,50 @@
+import asyncio
+
+from curvequery._tek_series_mso_async_feat import _iterate_in_executor
+
+
+def test_iterate_in_executor():
+    """Verify the asynchronous generator yields the items of the blocking generator"""
+
+    async def collect():
+        return [i async for i in _iterate_in_executor(i for i in range(5))]
+
+    assert asyncio.run(collect()) == [0, 1, 2, 3, 4]
+
+
+def test_iterate_in_executor_closes_generator():
+    """Verify the blocking generator is closed when the iteration stops early"""
+    closed = []
+
+    def generator():
+        try:
+            yield from range(5)
+        finally:
+            closed.append(True)
+
+    async def collect():
+        items = _iterate_in_executor(generator())
+        async for i in items:
+            if i == 1:
+                break
+        await items.aclose()
+
+    asyncio.run(collect())
+    assert closed == [True]
+
+
+def test_curve_async_matches_curve(all_series_osc):
+    """Verify the asynchronous API downloads the same data as the blocking API"""
+    if all_series_osc:
+        all_series_osc.default_setup()
+        all_series_osc.write("TRIGGER:A:EDGE:SOURCE LINE")
+
+        async def acquire_and_download():
+            async for _ in all_series_osc.acquire_async(count=1):
+                pass
+            return await all_series_osc.curve_async(use_pbar=False)
+
+        actual = asyncio.run(acquire_and_download())
+        expected = all_series_osc.curve(use_pbar=False)
+        assert actual.sources == expected.sources
+        assert actual["CH1"] == expected["CH1"]
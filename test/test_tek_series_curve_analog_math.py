@@ -2,6 +2,7 @@ from math import sin
 from math import pi
 from math import fabs
 
+import numpy as np
 import pytest
 from pytest import approx
 
@@ -68,6 +69,77 @@ def test_sine_wave(curve_data_afg_50mhz_ch1_math1, target, scale):
         assert i == approx(0, abs=fabs(scale / 10))
 
 
+@pytest.mark.parametrize("target", ["CH1", "MATH1"])
+def test_as_ndarray_matches_list(
+    all_series_osc_with_afg, curve_data_afg_50mhz_ch1_math1, target
+):
+    """Verify the ndarray waveform data matches the default list waveform data"""
+    if all_series_osc_with_afg:
+        actual = all_series_osc_with_afg.curve(as_ndarray=True)[target].data
+        expected = curve_data_afg_50mhz_ch1_math1[target].data
+        assert isinstance(actual, np.ndarray)
+        assert actual.dtype.isnative
+        assert actual.tolist() == approx(expected)
+
+
+def test_raw_matches_scaled(all_series_osc_with_afg, curve_data_afg_50mhz_ch1_math1):
+    """Verify a raw waveform converts to the same values as a scaled waveform"""
+    if all_series_osc_with_afg:
+        actual = all_series_osc_with_afg.curve(raw=True)["CH1"]
+        expected = curve_data_afg_50mhz_ch1_math1["CH1"]
+        assert actual.raw_data.dtype == np.int16
+        assert actual.y_scale == expected.y_scale
+        assert actual.data.tolist() == approx(expected.data)
+
+
+def test_8_bit_transfer_matches_16_bit(
+    all_series_osc_with_afg, curve_data_afg_50mhz_ch1_math1
+):
+    """Verify an 8-bit transfer matches a 16-bit transfer within its resolution"""
+    if all_series_osc_with_afg:
+        actual = all_series_osc_with_afg.curve(bit_nr=8, as_ndarray=True)["CH1"]
+        expected = curve_data_afg_50mhz_ch1_math1["CH1"]
+        resolution = (expected.y_scale.top - expected.y_scale.bottom) / 256
+        assert actual.data.tolist() == approx(expected.data, abs=resolution)
+
+
+@pytest.mark.parametrize("target", ["CH1", "MATH1"])
+def test_lazy_matches_eager(
+    all_series_osc_with_afg, curve_data_afg_50mhz_ch1_math1, target
+):
+    """Verify a lazily decoded source matches the eagerly decoded source"""
+    if all_series_osc_with_afg:
+        actual = all_series_osc_with_afg.curve(lazy=True)
+        assert actual.sources == curve_data_afg_50mhz_ch1_math1.sources
+        assert actual[target] == curve_data_afg_50mhz_ch1_math1[target]
+
+
+@pytest.mark.parametrize("target", ["CH1", "MATH1"])
+def test_window_matches_full_record(
+    all_series_osc_with_afg, curve_data_afg_50mhz_ch1_math1, target
+):
+    """Verify a window of a single source matches the same samples of the record"""
+    if all_series_osc_with_afg:
+        expected = curve_data_afg_50mhz_ch1_math1[target]
+        actual = all_series_osc_with_afg.curve(sources=[target], start=10, stop=110)
+        assert actual.sources == [target]
+        assert actual[target].data == approx(expected.data[10:110])
+        assert actual[target].x_scale.offset == approx(
+            expected.x_scale.offset + 10 * expected.x_scale.slope
+        )
+
+
+@pytest.mark.parametrize("target", ["CH1", "MATH1"])
+def test_pipeline_matches_sequential(
+    all_series_osc_with_afg, curve_data_afg_50mhz_ch1_math1, target
+):
+    """Verify a pipelined download returns the same data as a sequential download"""
+    if all_series_osc_with_afg:
+        actual = all_series_osc_with_afg.curve(pipeline=True)
+        assert actual.sources == curve_data_afg_50mhz_ch1_math1.sources
+        assert actual[target] == curve_data_afg_50mhz_ch1_math1[target]
+
+
 @pytest.mark.parametrize("verticle_scale, position", TEST_Y_SCALE_SETTINGS)
 def test_y_scale(all_series_osc, verticle_scale, position):
     if all_series_osc:
@@ -106,3 +106,12 @@ def test_counter_check_sources(curve_data_dch_counter_decompose, target):
     """Verify the resulting waveforms contain the correct sources"""
     assert len(curve_data_dch_counter_decompose.sources) == 8
     assert target in curve_data_dch_counter_decompose.sources
+
+
+def test_counter_packed_bits_match(all_series_osc, curve_data_dch_counter_decompose):
+    """Verify packed bit waveforms unpack into the decomposed bit waveforms"""
+    if all_series_osc:
+        packed = all_series_osc.curve(decompose_dch=True, pack_bits=True)
+        for target in curve_data_dch_counter_decompose.sources:
+            expected = curve_data_dch_counter_decompose[target].data
+            assert packed[target].data.tolist() == expected
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+FRAME_COUNT = 10
+RECORD_LENGTH = 1000
+
+
+@pytest.fixture(scope="session")
+def curve_frames(all_series_osc):
+    if all_series_osc:
+        all_series_osc.default_setup()
+        all_series_osc.write("HORIZONTAL:MODE MANUAL")
+        all_series_osc.write(f"HORIZONTAL:MODE:RECORDLENGTH {RECORD_LENGTH}")
+        all_series_osc.write("HORIZONTAL:FASTFRAME:STATE ON")
+        all_series_osc.write(f"HORIZONTAL:FASTFRAME:COUNT {FRAME_COUNT}")
+        all_series_osc.write("TRIGGER:A:EDGE:SOURCE LINE")
+        for _ in all_series_osc.acquire(count=1, timeout=30):
+            pass
+    return all_series_osc.curve_frames(use_pbar=False)
+
+
+def test_frames_shape(curve_frames):
+    """Verify each source is returned as a frames x samples array"""
+    assert curve_frames["CH1"].data.shape == (FRAME_COUNT, RECORD_LENGTH)
+
+
+def test_frames_timestamps(curve_frames):
+    """Verify there is a timestamp for each frame"""
+    assert len(curve_frames["CH1"].timestamps) == FRAME_COUNT
+
+
+def test_frame_range(all_series_osc, curve_frames):
+    """Verify a range of frames matches the same rows of all the frames"""
+    if all_series_osc:
+        actual = all_series_osc.curve_frames(
+            start_frame=3, stop_frame=5, timestamps=False, use_pbar=False
+        )
+        assert actual["CH1"].timestamps is None
+        assert np.array_equal(actual["CH1"].data, curve_frames["CH1"].data[2:5])
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from pytest import approx
+
+CHUNK_SIZE = 3000
+
+
+@pytest.fixture(scope="session")
+def curve_data_and_chunks(all_series_osc):
+    if all_series_osc:
+        all_series_osc.default_setup()
+        all_series_osc.write("DISPLAY:GLOBAL:CH2:STATE 1")
+        all_series_osc.write("HORIZONTAL:MODE MANUAL")
+        all_series_osc.write("HORIZONTAL:MODE:RECORDLENGTH 10000")
+        all_series_osc.write("TRIGGER:A:EDGE:SOURCE LINE")
+        for _ in all_series_osc.acquire(count=1):
+            pass
+    chunks = list(all_series_osc.curve_stream(chunk_size=CHUNK_SIZE))
+    return all_series_osc.curve(as_ndarray=True), chunks
+
+
+def test_chunk_sources(curve_data_and_chunks):
+    """Verify the chunks include every source of the waveform collection"""
+    collection, chunks = curve_data_and_chunks
+    assert sorted(set(c.source for c in chunks)) == sorted(collection.sources)
+
+
+def test_chunk_size(curve_data_and_chunks):
+    """Verify no chunk is larger than the requested chunk size"""
+    _, chunks = curve_data_and_chunks
+    for chunk in chunks:
+        assert 0 < len(chunk.waveform.data) <= CHUNK_SIZE
+
+
+@pytest.mark.parametrize("target", ["CH1", "CH2"])
+def test_chunks_match_curve(curve_data_and_chunks, target):
+    """Verify the chunks of a source join into the same data as the full record"""
+    collection, chunks = curve_data_and_chunks
+    source_chunks = [c for c in chunks if c.source == target]
+    actual = np.concatenate([c.waveform.data for c in source_chunks])
+    assert np.array_equal(actual, collection[target].data)
+
+
+@pytest.mark.parametrize("target", ["CH1", "CH2"])
+def test_chunk_x_offset(curve_data_and_chunks, target):
+    """Verify the horizontal offset of each chunk is the time of its first sample"""
+    collection, chunks = curve_data_and_chunks
+    x_scale = collection[target].x_scale
+    for chunk in (c for c in chunks if c.source == target):
+        expected = x_scale.offset + chunk.start * x_scale.slope
+        assert chunk.waveform.x_scale.offset == approx(expected)
+
+
+def test_curve_to_disk_matches_curve(all_series_osc, curve_data_and_chunks, tmp_path):
+    """Verify the waveforms written to disk match the waveforms in memory"""
+    if all_series_osc:
+        collection, _ = curve_data_and_chunks
+        actual = all_series_osc.curve_to_disk(str(tmp_path), chunk_size=CHUNK_SIZE)
+        assert actual.sources == collection.sources
+        for source in collection.sources:
+            assert isinstance(actual[source].data, np.memmap)
+            assert np.array_equal(actual[source].data, collection[source].data)
+            assert (tmp_path / (source + ".npy")).exists()
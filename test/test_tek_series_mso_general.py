@@ -2,6 +2,20 @@ import pytest
 
 # noinspection PyProtectedMember
 from curvequery._tek_series_mso import get_event_queue
+from curvequery._tek_series_mso import _compound
+from curvequery._tek_series_mso import query_many
+from curvequery._tek_series_mso import auto_chunk_size
+from curvequery._tek_series_mso import auto_timeout
+from curvequery._tek_series_mso import get_throughput
+from curvequery._tek_series_mso import update_throughput
+from curvequery._tek_series_mso import DEFAULT_THROUGHPUT
+from curvequery._tek_series_mso import MIN_CHUNK_SIZE
+from curvequery._tek_series_mso import MAX_CHUNK_SIZE
+from curvequery._tek_series_mso import Window
+from curvequery._tek_series_mso import window_indices
+from curvequery._tek_series_mso_curve_feat import TekSeriesCurveFeat
+from curvequery.api_types import TransferStats
+from curvequery.api_types import XScale
 
 INVALID_COMMAND = "INVALID:COMMAND"
 
@@ -66,3 +80,88 @@ def test_setup_setter_restores_ch2(all_series_osc):
         all_series_osc.setup(settings)
         actual = all_series_osc.query(":DISPLAY:GLOBAL:CH2:STATE?").strip()
         assert actual == "1"
+
+
+def test_compound_commands_start_from_root():
+    """Verify every command after the first is prefixed with a colon"""
+    actual = _compound(["data:start 1", ":data:stop 10", "WFMOutpre:XINCR?"])
+    assert actual == "data:start 1;:data:stop 10;:WFMOutpre:XINCR?"
+
+
+def test_query_many_returns_each_response(all_series_osc):
+    """Verify a compound query returns one response for each query"""
+    if all_series_osc:
+        all_series_osc.default_setup()
+        with all_series_osc.rsrc_mgr.open_resource(all_series_osc.rsrc_name) as inst:
+            actual = query_many(
+                inst, ["DISPLAY:GLOBAL:CH1:STATE?", "DISPLAY:GLOBAL:CH2:STATE?"]
+            )
+            assert actual == ["1", "0"]
+
+
+@pytest.mark.parametrize(
+    "block_bytes, expected",
+    [(0, MIN_CHUNK_SIZE), (100000, 100000), (10**9, MAX_CHUNK_SIZE)],
+)
+def test_auto_chunk_size(block_bytes, expected):
+    """Verify the chunk size follows the block size within its limits"""
+    assert auto_chunk_size(block_bytes) == expected
+
+
+def test_auto_timeout():
+    """Verify the timeout is extended by twice the expected transfer time"""
+    assert auto_timeout(2000, 10**7, 10**6) == 22000
+    assert auto_timeout(None, 10**7, 10**6) is None
+
+
+def test_update_throughput():
+    """Verify the throughput starts at the default and then averages the rates"""
+    assert get_throughput("THROUGHPUT::INSTR") == DEFAULT_THROUGHPUT
+    update_throughput("THROUGHPUT::INSTR", TransferStats(4000, 1.0))
+    update_throughput("THROUGHPUT::INSTR", TransferStats(0, 0.0))
+    assert get_throughput("THROUGHPUT::INSTR") == 4000
+    update_throughput("THROUGHPUT::INSTR", TransferStats(2000, 1.0))
+    assert get_throughput("THROUGHPUT::INSTR") == 3000
+
+
+@pytest.mark.parametrize(
+    "window, expected",
+    [
+        (Window(None, None, None, None), (0, 1000)),
+        (Window(100, 200, None, None), (100, 200)),
+        (Window(-5, 5000, None, None), (0, 1000)),
+        (Window(None, None, -4e-7, -3.015e-7), (100, 199)),
+        (Window(150, None, -4e-7, -3e-7), (150, 201)),
+    ],
+)
+def test_window_indices(window, expected):
+    """Verify sample and time windows are converted to indices within the record"""
+    x_scale = XScale(slope=1e-9, offset=-5e-7, unit="s")
+    assert window_indices(window, x_scale, 1000) == expected
+
+
+def test_window_indices_empty():
+    """Verify a window without samples raises ValueError"""
+    x_scale = XScale(slope=1e-9, offset=-5e-7, unit="s")
+    with pytest.raises(ValueError):
+        window_indices(Window(None, None, 1.0, None), x_scale, 1000)
+
+
+@pytest.mark.parametrize(
+    "selected, expected",
+    [
+        (None, ["CH1", "CH2_D0", "CH2_D1", "MATH1"]),
+        (["MATH1", "CH2_D1"], ["CH2_D1", "MATH1"]),
+        (["CH2"], ["CH2_D0", "CH2_D1"]),
+    ],
+)
+def test_select_sources(selected, expected):
+    """Verify sources are selected by name, and a DCH name selects all its bits"""
+    available = ["CH1", "CH2_D0", "CH2_D1", "MATH1"]
+    assert TekSeriesCurveFeat._select_sources(available, selected) == expected
+
+
+def test_select_sources_missing():
+    """Verify selecting a source that is not available raises ValueError"""
+    with pytest.raises(ValueError):
+        TekSeriesCurveFeat._select_sources(["CH1"], ["CH1", "CH4"])
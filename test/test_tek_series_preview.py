@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from pytest import approx
+
+RECORD_LENGTH = 100000
+POINTS = 1000
+
+
+@pytest.fixture(scope="session")
+def full_curve(all_series_osc):
+    if all_series_osc:
+        all_series_osc.default_setup()
+        all_series_osc.write("HORIZONTAL:MODE MANUAL")
+        all_series_osc.write(f"HORIZONTAL:MODE:RECORDLENGTH {RECORD_LENGTH}")
+        all_series_osc.write("TRIGGER:A:EDGE:SOURCE LINE")
+        for _ in all_series_osc.acquire(count=1):
+            pass
+    return all_series_osc.curve(as_ndarray=True)
+
+
+def test_envelope_preview(all_series_osc, full_curve):
+    """Verify the envelope holds the minimum and maximum of each bin of samples"""
+    if all_series_osc:
+        actual = all_series_osc.preview(points=POINTS)["CH1"]
+        expected = full_curve["CH1"]
+        bins = expected.data.reshape(POINTS, -1)
+        assert actual.data.shape == (POINTS, 2)
+        assert np.array_equal(actual.data[:, 0], bins.min(axis=1))
+        assert np.array_equal(actual.data[:, 1], bins.max(axis=1))
+        assert actual.x_scale.slope == approx(expected.x_scale.slope * bins.shape[1])
+
+
+def test_decimated_preview(all_series_osc, full_curve):
+    """Verify the decimated preview holds every Nth sample"""
+    if all_series_osc:
+        actual = all_series_osc.preview(points=POINTS, method="decimate")["CH1"]
+        expected = full_curve["CH1"]
+        step = RECORD_LENGTH // POINTS
+        assert np.array_equal(actual.data, expected.data[::step])
+        assert actual.x_scale.slope == approx(expected.x_scale.slope * step)
@@ -0,0 +1,63 @@
+from curvequery._tek_series_mso import open_session
+from curvequery._tek_series_mso import persistent_session
+
+
+class CountingResourceManager:
+    """A resource manager that counts the sessions it opens"""
+
+    class Resource:
+        def __init__(self, manager):
+            self.manager = manager
+
+        def __enter__(self):
+            self.manager.opened += 1
+            return self
+
+        def __exit__(self, *exc_info):
+            self.manager.closed += 1
+
+    def __init__(self):
+        self.opened = 0
+        self.closed = 0
+
+    def open_resource(self, resource_name):
+        return self.Resource(self)
+
+
+def test_open_session_without_persistent_session():
+    """Verify each session is opened and closed when no persistent session is open"""
+    rm = CountingResourceManager()
+    for _ in range(3):
+        with open_session(rm, "INSTR"):
+            pass
+    assert (rm.opened, rm.closed) == (3, 3)
+
+
+def test_open_session_reuses_persistent_session():
+    """Verify a persistent session is reused, and nested sessions do not close it"""
+    rm = CountingResourceManager()
+    with persistent_session(rm, "INSTR") as expected:
+        with persistent_session(rm, "INSTR") as nested:
+            assert nested is expected
+        for _ in range(3):
+            with open_session(rm, "INSTR") as actual:
+                assert actual is expected
+        assert (rm.opened, rm.closed) == (1, 0)
+    assert (rm.opened, rm.closed) == (1, 1)
+    with open_session(rm, "INSTR") as actual:
+        assert actual is not expected
+
+
+def test_session_curve_matches(all_series_osc):
+    """Verify the curve feature returns the same data inside a persistent session"""
+    if all_series_osc:
+        all_series_osc.default_setup()
+        all_series_osc.write("TRIGGER:A:EDGE:SOURCE LINE")
+        with all_series_osc.session():
+            for _ in all_series_osc.acquire(count=1):
+                pass
+            actual = all_series_osc.curve()
+            all_series_osc.setup(all_series_osc.setup())
+        expected = all_series_osc.curve()
+        assert actual.sources == expected.sources
+        assert actual["CH1"] == expected["CH1"]
@@ -0,0 +1,75 @@
+from curvequery.api_types import StateCache
+
+
+def test_filter_writes_skips_unchanged_settings():
+    """Verify only the commands that change a cached setting are returned"""
+    cache = StateCache()
+    assert cache.filter_writes(["data:source CH1", "data:start 1"]) == [
+        "data:source CH1",
+        "data:start 1",
+    ]
+    assert cache.filter_writes(["DATA:SOURCE CH2", ":data:start 1"]) == [
+        "DATA:SOURCE CH2"
+    ]
+
+
+def test_filter_writes_resends_coupled_settings():
+    """Verify the transfer width is written again after the encoding or the source
+    changes, because the instrument changes it along with them"""
+    cache = StateCache()
+    commands = ["data:source CH1", "data:encdg RIBinary", "WFMOUTPRE:BIT_NR 16"]
+    assert cache.filter_writes(commands) == commands
+    assert cache.filter_writes(["data:source MATH1", "data:encdg FPBinary"]) == [
+        "data:source MATH1",
+        "data:encdg FPBinary",
+    ]
+    assert cache.filter_writes(commands) == commands
+    assert cache.filter_writes(commands) == []
+
+
+def test_invalidate_scope():
+    """Verify invalidating a scope only forgets the metadata of that scope"""
+    cache = StateCache()
+    cache.filter_writes(["data:start 1"])
+    cache.metadata[StateCache.CONFIGURATION]["horizontal:recordlength?"] = "1000"
+    cache.metadata[StateCache.ACQUISITION]["data:source:available?"] = "CH1"
+    cache.invalidate(StateCache.ACQUISITION)
+    assert cache.settings == {"data:start": "1"}
+    assert cache.metadata[StateCache.CONFIGURATION]
+    assert not cache.metadata[StateCache.ACQUISITION]
+    cache.invalidate()
+    assert not cache.settings
+    assert not cache.metadata[StateCache.CONFIGURATION]
+
+
+def test_cached_curve_matches_uncached(all_series_osc):
+    """Verify the state cache does not change the downloaded waveforms"""
+    if all_series_osc:
+        all_series_osc.default_setup()
+        all_series_osc.write("DISPLAY:GLOBAL:CH2:STATE 1")
+        all_series_osc.write("TRIGGER:A:EDGE:SOURCE LINE")
+        for _ in all_series_osc.acquire(count=1):
+            pass
+        expected = all_series_osc.curve(as_ndarray=True)
+        try:
+            cache = all_series_osc.state_cache()
+            for _ in range(2):
+                actual = all_series_osc.curve(as_ndarray=True)
+                assert actual.sources == expected.sources
+                for source in expected.sources:
+                    assert (actual[source].data == expected[source].data).all()
+            assert cache.settings
+        finally:
+            all_series_osc.state_cache(enable=False)
+
+
+def test_default_setup_invalidates_cache(all_series_osc):
+    """Verify the default setup feature forgets the cached settings"""
+    if all_series_osc:
+        try:
+            cache = all_series_osc.state_cache()
+            all_series_osc.curve()
+            all_series_osc.default_setup()
+            assert not cache.settings
+        finally:
+            all_series_osc.state_cache(enable=False)
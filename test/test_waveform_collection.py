@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from curvequery.api_types import FrameWaveform
+from curvequery.api_types import Identity
+from curvequery.api_types import PackedWaveform
+from curvequery.api_types import RawWaveform
+from curvequery.api_types import Waveform
+from curvequery.api_types import WaveformCollection
+from curvequery.api_types import XScale
+from curvequery.api_types import YScale
+
+X_SCALE = XScale(slope=1e-9, offset=-5e-7, unit="s")
+Y_SCALE = YScale(top=5.0, bottom=-5.0)
+
+
+@pytest.fixture
+def collection():
+    result = WaveformCollection()
+    result.idn = Identity("TEKTRONIX", "MSO58", "Q200011", "CF:91.1CT")
+    codes = np.arange(-500, 500, dtype=np.int16)
+    result.data["CH1"] = Waveform((codes * 1e-3).tolist(), X_SCALE, Y_SCALE)
+    result.data["CH2"] = RawWaveform(codes, X_SCALE, Y_SCALE, 1.5e-4, 0.5)
+    result.data["CH3_D0"] = PackedWaveform(
+        np.packbits(codes & 1, bitorder="little"), len(codes), X_SCALE, None
+    )
+    result.data["MATH1"] = FrameWaveform(
+        codes.reshape(10, 100).astype(np.float32), X_SCALE, None, ["t1"] * 10
+    )
+    return result
+
+
+@pytest.mark.parametrize("mmap_mode", [None, "r"])
+def test_save_load_round_trip(collection, tmp_path, mmap_mode):
+    """Verify a loaded collection has the same waveforms and metadata"""
+    collection.save(str(tmp_path))
+    actual = WaveformCollection.load(str(tmp_path), mmap_mode=mmap_mode)
+    assert actual.idn == collection.idn
+    assert actual.sources == collection.sources
+    for source in collection.sources:
+        expected = collection[source]
+        assert type(actual[source]) is type(expected)
+        assert np.array_equal(actual[source].data, expected.data)
+        assert actual[source][1:] == expected[1:]
+
+
+def test_save_keeps_raw_codes(collection, tmp_path):
+    """Verify raw waveforms are saved as their integer codes"""
+    collection.save(str(tmp_path))
+    assert np.array_equal(
+        np.load(str(tmp_path / "CH2.npy")), collection["CH2"].raw_data
+    )
+
+
+def test_lazy_sources_decoded_once_on_access():
+    """Verify lazy sources are listed before decoding and decoded together once"""
+    calls = []
+
+    def decoder():
+        calls.append(True)
+        return [("CH3_D0", Waveform([0, 1], X_SCALE, None)), ("CH3_D1", None)]
+
+    result = WaveformCollection()
+    result.add_lazy(["CH3_D0", "CH3_D1"], decoder)
+    assert result.sources == ["CH3_D0", "CH3_D1"]
+    assert len(result) == 2
+    assert result.data == {}
+    assert not calls
+    assert result["CH3_D0"].data == [0, 1]
+    assert result["CH3_D1"] is None
+    assert len(calls) == 1
+
+
+def test_release_decodes_again():
+    """Verify a released source is decoded again on its next access"""
+    calls = []
+
+    def decoder():
+        calls.append(True)
+        return [("CH1", Waveform([len(calls)], X_SCALE, Y_SCALE))]
+
+    result = WaveformCollection()
+    result.add_lazy(["CH1"], decoder)
+    assert result["CH1"].data == [1]
+    result.release("CH1")
+    assert "CH1" not in result.data
+    assert result["CH1"].data == [2]
+
+
+def test_items_decodes_lazy_sources(collection):
+    """Verify items() returns every source, decoding lazy sources"""
+    collection.add_lazy(["CH4"], lambda: [("CH4", Waveform([1], X_SCALE, None))])
+    items = dict(collection.items())
+    assert list(items) == ["CH4", "CH1", "CH2", "CH3_D0", "MATH1"]
+    assert items["CH4"].data == [1]
+    assert collection.data["CH4"].data == [1]
+
+
+def test_save_load_without_x_scale(tmp_path):
+    """Verify a waveform without a horizontal scale can be loaded"""
+    collection = WaveformCollection()
+    collection.data["CH1"] = Waveform(np.arange(10.0), None, None)
+    collection.save(str(tmp_path))
+    actual = WaveformCollection.load(str(tmp_path))
+    assert actual["CH1"].x_scale is None
+    assert np.array_equal(actual["CH1"].data, np.arange(10.0))